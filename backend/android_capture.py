@@ -0,0 +1,131 @@
+import io
+import logging
+import socket
+import subprocess
+import threading
+
+logger = logging.getLogger('SmartBot')
+
+ADB_SERVER_HOST = '127.0.0.1'
+ADB_SERVER_PORT = 5037
+
+class AdbError(Exception):
+    pass
+
+class AndroidCapture:
+    """
+    Screen capture for one Android device.
+
+    Talks to the local adb server directly over its socket protocol and streams the
+    framebuffer (`screencap -p`) straight to the host, so there is no process spawn,
+    no temporary file on the device and no `adb pull`. If the adb server can't be
+    reached it falls back to `adb exec-out`, which streams the same bytes over stdout.
+    """
+
+    def __init__(self, udid, scale=1.0, compress_level=6, timeout=15):
+        self.udid = udid
+        self.scale = scale
+        self.compress_level = compress_level
+        self.timeout = timeout
+        self._lock = threading.Lock()  # one capture at a time per device
+
+    def _send(self, sock, payload):
+        data = payload.encode()
+        sock.sendall(f'{len(data):04x}'.encode() + data)
+        status = self._recv_exact(sock, 4)
+        if status != b'OKAY':
+            length = int(self._recv_exact(sock, 4), 16)
+            raise AdbError(self._recv_exact(sock, length).decode(errors='replace'))
+
+    def _recv_exact(self, sock, size):
+        buf = b''
+        while len(buf) < size:
+            chunk = sock.recv(size - len(buf))
+            if not chunk:
+                raise AdbError('adb server closed the connection')
+            buf += chunk
+        return buf
+
+    def _exec_via_server(self, command):
+        with socket.create_connection((ADB_SERVER_HOST, ADB_SERVER_PORT), timeout=self.timeout) as sock:
+            self._send(sock, f'host:transport:{self.udid}')
+            self._send(sock, f'exec:{command}')
+            chunks = []
+            while True:
+                chunk = sock.recv(65536)
+                if not chunk:
+                    break
+                chunks.append(chunk)
+            return b''.join(chunks)
+
+    def _exec_via_cli(self, command):
+        result = subprocess.run(
+            ['adb', '-s', self.udid, 'exec-out'] + command.split(),
+            capture_output=True, timeout=self.timeout, check=True,
+        )
+        return result.stdout
+
+    def capture_png(self):
+        """Returns the current screen as PNG bytes, downscaled/recompressed if configured."""
+        with self._lock:
+            try:
+                data = self._exec_via_server('screencap -p')
+            except (OSError, AdbError) as e:
+                logger.debug(f"[Android] adb server capture failed for {self.udid} ({e}), using adb exec-out")
+                data = self._exec_via_cli('screencap -p')
+        if not data.startswith(b'\x89PNG'):
+            raise AdbError(f'screencap returned no PNG data for {self.udid}')
+        return self._ingest(data)
+
+    def _ingest(self, data):
+        if self.scale >= 1.0:
+            return data
+        try:
+            from PIL import Image
+        except ImportError:
+            return data
+        with Image.open(io.BytesIO(data)) as img:
+            size = (max(1, int(img.width * self.scale)), max(1, int(img.height * self.scale)))
+            out = io.BytesIO()
+            img.resize(size).save(out, format='PNG', compress_level=self.compress_level)
+            return out.getvalue()
+
+    def save(self, path):
+        data = self.capture_png()
+        with open(path, 'wb') as f:
+            f.write(data)
+        return path
+
+_captures = {}
+_captures_lock = threading.Lock()
+
+def get_capture(udid, capture_config=None):
+    """Returns the shared capture instance for a device, creating it on first use."""
+    with _captures_lock:
+        capture = _captures.get(udid)
+        if capture is None:
+            capture_config = capture_config or {}
+            capture = AndroidCapture(
+                udid,
+                scale=capture_config.get('scale', 1.0),
+                compress_level=capture_config.get('compress_level', 6),
+                timeout=capture_config.get('timeout', 15),
+            )
+            _captures[udid] = capture
+        return capture
+
+def save_screenshot(service_config, path, driver=None):
+    """
+    Saves a device screenshot to `path` via the streamed capture, falling back to the
+    Appium driver if the device can't be captured directly. Returns True on success.
+    """
+    udid = service_config.get('device_udid')
+    if udid:
+        try:
+            get_capture(udid, service_config.get('capture')).save(path)
+            return True
+        except Exception as e:
+            logger.warning(f"[Android] Streamed capture failed for {udid}: {e}")
+    if driver:
+        return driver.save_screenshot(str(path))
+    return False
@@ -1,7 +1,14 @@
-from flask import Flask, jsonify, send_from_directory
-from flask_socketio import SocketIO
+from flask import Flask, Response, jsonify, request, send_from_directory
+from flask_socketio import SocketIO, emit
 import logging
+import queue
 from datetime import datetime
+from pathlib import Path
+
+import database
+import metrics
+import profiler
+from read_pool import ReadPool, list_files
 
 # Custom logging handler to stream logs via Socket.IO
 class SocketIOHandler(logging.Handler):
@@ -19,11 +26,46 @@ class SocketIOHandler(logging.Handler):
         }
         self.socketio.emit(self.event_name, log_entry)
 
-def create_api(bot_instance):
+# SocketIO that counts every emitted event for /metrics. Once start_broadcaster() is called,
+# emits are queued and sent by a background task, so callers never wait on slow clients.
+class CountingSocketIO(SocketIO):
+    _outbox = None
+
+    def start_broadcaster(self, maxsize=10000):
+        self._outbox = queue.Queue(maxsize)
+        self.start_background_task(self._broadcast)
+
+    def emit(self, event, *args, **kwargs):
+        metrics.socketio_emits.inc(event)
+        if self._outbox is None:
+            return super().emit(event, *args, **kwargs)
+        try:
+            self._outbox.put_nowait((event, args, kwargs))
+        except queue.Full:
+            metrics.socketio_dropped.inc()
+
+    def _broadcast(self):
+        while True:
+            event, args, kwargs = self._outbox.get()
+            try:
+                super().emit(event, *args, **kwargs)
+            except Exception:
+                pass
+
+def _rows_to_json(rows):
+    return [{'timestamp': r[0], 'event_type': r[1], 'details': r[2]} for r in rows]
+
+def create_api(bot_instance, async_mode='threading'):
     app = Flask(__name__)
-    socketio = SocketIO(app, cors_allowed_origins="*")
+    socketio = CountingSocketIO(app, cors_allowed_origins="*", async_mode=async_mode)
+    socketio.start_broadcaster()
     logging.getLogger('werkzeug').disabled = True # Disable noisy Flask logs
 
+    # Blocking reads run here, each pool thread with its own read-only connection
+    api_config = bot_instance.config.get('api', {})
+    read_pool = ReadPool(bot_instance.db_path, size=api_config.get('read_pool_size', 4), async_mode=async_mode)
+    app.extensions['read_pool'] = read_pool
+
     # Create the handler to be used by the main application logger
     socket_io_handler = SocketIOHandler(socketio)
 
@@ -33,40 +75,45 @@ def create_api(bot_instance):
 
     @app.route('/api/logs', methods=['GET'])
     def get_logs():
-        logs = bot_instance.db.get_recent_logs(bot_instance.db_conn, limit=100)
-        return jsonify([{'timestamp': r[0], 'event_type': r[1], 'details': r[2]} for r in logs])
+        return jsonify(_rows_to_json(read_pool.query(database.get_recent_logs, 100)))
 
     @app.route('/api/ott_checks', methods=['GET'])
     def get_ott_checks():
-        logs = bot_instance.db.get_recent_logs(bot_instance.db_conn, limit=100)
-        ott_checks = [
-            {'timestamp': r[0], 'event_type': r[1], 'details': r[2]}
-            for r in logs if r[1] == 'ott_check'
-        ]
-        return jsonify(ott_checks)
+        return jsonify(_rows_to_json(read_pool.query(database.get_recent_events, 'ott_check', 100)))
     
     @app.route('/api/drm_handshakes', methods=['GET'])
     def get_drm_handshakes():
-        logs = bot_instance.db.get_recent_logs(bot_instance.db_conn, limit=100)
-        drm_events = [
-            {'timestamp': r[0], 'event_type': r[1], 'details': r[2]}
-            for r in logs if r[1] == 'drm_handshake'
-        ]
-        return jsonify(drm_events)
+        return jsonify(_rows_to_json(read_pool.query(database.get_recent_events, 'drm_handshake', 100)))
+
+    @app.route('/metrics', methods=['GET'])
+    def get_metrics():
+        return Response(bot_instance.render_metrics(), mimetype='text/plain; version=0.0.4')
+
+    @app.route('/api/cluster', methods=['GET'])
+    def get_cluster():
+        # With coordination enabled this reads the shared store, so keep it off the request thread
+        return jsonify(read_pool.run(bot_instance.cluster_snapshot))
+
+    @app.route('/api/latency', methods=['GET'])
+    def get_latency():
+        return jsonify(bot_instance.latency_snapshot())
 
     @app.route('/api/screenshots', methods=['GET'])
     def list_screenshots():
-        files = sorted(
-            bot_instance.screenshots_dir.glob('*.png'), 
-            key=lambda p: p.stat().st_mtime, 
-            reverse=True
-        )
-        return jsonify({'files': [f.name for f in files]})
+        return jsonify({'files': read_pool.run(list_files, bot_instance.screenshots_dir, '.png')})
 
     @app.route('/screenshots/<path:filename>')
     def serve_screenshot(filename):
         return send_from_directory(bot_instance.screenshots_dir.resolve(), filename)
 
+    @app.route('/api/profiles', methods=['GET'])
+    def list_profiles():
+        return jsonify({'files': read_pool.run(list_files, bot_instance.profiles_dir)})
+
+    @app.route('/profiles/<path:filename>')
+    def serve_profile(filename):
+        return send_from_directory(bot_instance.profiles_dir.resolve(), filename, as_attachment=True)
+
     @app.route('/api/control/<action>', methods=['POST'])
     def control_bot(action):
         if action == 'pause':
@@ -74,15 +121,131 @@ def create_api(bot_instance):
         elif action == 'resume':
             bot_instance.resume()
         elif action == 'rotate':
-            bot_instance.force_rotate = True
+            bot_instance.request_rotation()
+        elif action == 'profile_start':
+            try:
+                seconds = int(request.args.get('seconds', 60))
+            except ValueError:
+                return jsonify({'status': 'error', 'message': 'seconds must be a whole number'}), 400
+            try:
+                seconds = bot_instance.profiler.start(seconds)
+            except RuntimeError as e:
+                return jsonify({'status': 'error', 'message': str(e)}), 409
+            return jsonify({'status': 'success', 'message': f'Profiling for up to {seconds}s'})
+        elif action == 'profile_stop':
+            path = bot_instance.profiler.stop()
+            return jsonify({'status': 'success', 'file': path.name if path else None})
+        elif action == 'tracemalloc_start':
+            profiler.tracemalloc_start()
+        elif action == 'tracemalloc_snapshot':
+            try:
+                dump_path, summary_path = profiler.tracemalloc_snapshot(bot_instance.profiles_dir)
+            except RuntimeError as e:
+                return jsonify({'status': 'error', 'message': str(e)}), 409
+            return jsonify({'status': 'success', 'files': [dump_path.name, summary_path.name]})
+        elif action == 'tracemalloc_stop':
+            profiler.tracemalloc_stop()
         else:
             return jsonify({'status': 'error', 'message': 'Invalid action'}), 400
         return jsonify({'status': 'success', 'message': f'Action "{action}" triggered'})
 
+    # Pushed status updates are deltas, so a new client first gets the full status
+    @socketio.on('connect')
+    def handle_connect():
+        emit('status_update', bot_instance.get_status())
+
     # SocketIO test event
     @socketio.on('ping')
     def handle_ping():
         socketio.emit('pong')
 
     # Return app, socketio, and the custom log handler
-    return app, socketio, socket_io_handler
\ No newline at end of file
+    return app, socketio, socket_io_handler
+
+class RemoteBot:
+    """
+    Stands in for SmartBot inside the API process (process_mode "multi"). Reads go to its
+    own database connection and the latest snapshots pushed by the coordinator; controls
+    are forwarded to the coordinator over the control queue.
+    """
+
+    def __init__(self, config, control_queue):
+        self.config = config
+        self.control_queue = control_queue
+        self.db = database
+        self.db_path = Path(config['paths'].get('database', 'smartbot.db'))
+        self.db_conn = database.setup_database(self.db_path)
+        self.screenshots_dir = Path(config['paths'].get('screenshots', 'screenshots'))
+        self.profiles_dir = Path(config['paths'].get('profiles', 'profiles'))
+        self.profiler = profiler.SamplingProfiler(self.profiles_dir)
+        self.status = {}
+        self.metrics_text = ''
+        self.latency = {}
+        self.cluster = {'enabled': False}
+
+    def get_status(self):
+        return self.status
+
+    def cluster_snapshot(self):
+        return self.cluster
+
+    def render_metrics(self):
+        return self.metrics_text
+
+    def latency_snapshot(self):
+        return self.latency
+
+    def pause(self):
+        self.control_queue.put('pause')
+
+    def resume(self):
+        self.control_queue.put('resume')
+
+    def request_rotation(self):
+        self.control_queue.put('rotate')
+
+def _blocking_caller(config, async_mode):
+    """
+    Returns call(fn) that runs a blocking fn (a multiprocessing queue read) on a native
+    thread of its own, so it never takes one of the ReadPool's threads.
+    """
+    if async_mode == 'gevent':
+        from gevent.threadpool import ThreadPool
+        pool = ThreadPool(1)
+        return pool.apply
+    if async_mode == 'eventlet':
+        from eventlet import tpool
+        # One tpool thread on top of the ReadPool's
+        tpool.set_num_threads(config['api'].get('read_pool_size', 4) + 1)
+        return tpool.execute
+    # Background tasks are real threads in threading mode
+    return lambda fn: fn()
+
+def run_api_process(config, events_queue, control_queue):
+    """
+    Serves HTTP/Socket.IO in the API process and relays coordinator events. Started
+    through api_main, which applies api.async_mode's monkey-patching first.
+    """
+    async_mode = config['api'].get('async_mode', 'threading')
+    bot = RemoteBot(config, control_queue)
+    app, socketio, _ = create_api(bot, async_mode=async_mode)
+    call = _blocking_caller(config, async_mode)
+    snapshots = {'__status__': 'status', '__metrics__': 'metrics_text', '__latency__': 'latency', '__cluster__': 'cluster'}
+
+    def relay_events():
+        while True:
+            event, data = call(events_queue.get)
+            if event == 'status_update':
+                bot.status = {**bot.status, **data}
+            if event in snapshots:
+                setattr(bot, snapshots[event], data)
+            else:
+                socketio.emit(event, data)
+
+    socketio.start_background_task(relay_events)
+    options = {}
+    if async_mode == 'threading':
+        # Spawned processes get /dev/null as stdin, which Flask-SocketIO takes for a production
+        # deployment and refuses to start Werkzeug in
+        options['allow_unsafe_werkzeug'] = True
+    socketio.run(app, host=config['api'].get('host', '0.0.0.0'), port=config['api'].get('port', 5000), **options)
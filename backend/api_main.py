@@ -0,0 +1,18 @@
+"""
+Entry point of the API process in multi-process mode (see smartbot.run_multiprocess).
+
+gevent/eventlet have to patch the standard library before Flask, Socket.IO, requests or
+ssl are imported, so this module imports nothing at the top and the API process is
+spawned with it as its main module instead of smartbot.py.
+"""
+
+def main(config, events_queue, control_queue):
+    async_mode = config['api'].get('async_mode', 'threading')
+    if async_mode == 'gevent':
+        from gevent import monkey
+        monkey.patch_all()
+    elif async_mode == 'eventlet':
+        import eventlet
+        eventlet.monkey_patch()
+    import api
+    api.run_api_process(config, events_queue, control_queue)
@@ -0,0 +1,222 @@
+#!/usr/bin/env python3
+"""
+Offline throughput benchmark for SmartBot, run against the local mock OTT sites (mock_ott.py)
+and the simulated device manager.
+
+  python3 benchmark.py checks --repeat 3          # check_ott against every mock page
+  python3 benchmark.py loop --duration 300        # the full SmartBot.run loop
+  python3 benchmark.py loop --save-baseline vps   # ... and keep the numbers
+  python3 benchmark.py loop --compare vps         # ... or compare against saved numbers
+
+Reports checks per minute, p50/p95 check latency, peak RSS (bot plus its browser/driver
+processes) and, for the loop, the database write rate. Baselines are JSON files under
+--baseline-dir; --compare exits non-zero when a metric regressed by more than --tolerance.
+"""
+
+import argparse
+import json
+import math
+import os
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+import procfs
+from mock_ott import MockOttServer
+from ott_checker import DRM_LICENSE_HOSTS
+
+# What each mock page should be classified as, and whether it makes a license request
+EXPECTED = {
+    'player': ('pass', True),
+    'slow': ('pass', True),
+    'geo': ('geo_block', False),
+    'error': ('error', False),
+}
+
+# Direction in which each reported metric gets better
+HIGHER_IS_BETTER = {'checks_per_min': True, 'p50_ms': False, 'p95_ms': False, 'peak_rss_mb': False, 'db_writes_per_sec': None}
+
+def percentile(values, pct):
+    if not values:
+        return None
+    ordered = sorted(values)
+    # Nearest-rank percentile
+    return ordered[max(0, math.ceil(pct / 100 * len(ordered)) - 1)]
+
+class RssSampler:
+    """Samples the resident memory of this process plus all its descendants (browsers, drivers)."""
+
+    def __init__(self, interval=0.5):
+        self.interval = interval
+        self.peak = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='rss-sampler', daemon=True)
+
+    def _run(self):
+        while not self._stop.is_set():
+            pids = [os.getpid()] + procfs.find_descendants()
+            self.peak = max(self.peak, sum(procfs.process_rss_bytes(pid) for pid in pids))
+            self._stop.wait(self.interval)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+def _summary(durations_ms, elapsed, peak_rss):
+    return {
+        'checks': len(durations_ms),
+        'elapsed_s': round(elapsed, 1),
+        'checks_per_min': round(len(durations_ms) / elapsed * 60, 2) if elapsed else 0,
+        'p50_ms': percentile(durations_ms, 50),
+        'p95_ms': percentile(durations_ms, 95),
+        'peak_rss_mb': round(peak_rss / 2 ** 20, 1),
+    }
+
+def bench_checks(server, services, scenarios, repeat, work_dir, slow_delay):
+    """Runs check_ott against each (service, scenario) page `repeat` times."""
+    from ott_checker import check_ott
+    screenshots_dir = work_dir / 'screenshots'
+    screenshots_dir.mkdir(parents=True, exist_ok=True)
+    durations, mismatches = [], []
+    started = time.monotonic()
+    with RssSampler() as sampler:
+        for _ in range(repeat):
+            for service in services:
+                for scenario in scenarios:
+                    query = {'delay': slow_delay} if scenario == 'slow' else {}
+                    check_started = time.monotonic()
+                    result = check_ott(service, server.service_config(service, scenario, **query), screenshots_dir)
+                    durations.append(round((time.monotonic() - check_started) * 1000))
+                    got = (result.get('classification'), result.get('drm_handshake_detected'))
+                    if got != EXPECTED[scenario]:
+                        mismatches.append({'service': service, 'scenario': scenario, 'expected': EXPECTED[scenario], 'got': got})
+    report = _summary(durations, time.monotonic() - started, sampler.peak)
+    report['mismatches'] = mismatches
+    return report
+
+def loop_config(server, services, scenario, work_dir, interval, use_cache):
+    return {
+        'paths': {
+            'log': str(work_dir / 'smartbot.log'),
+            'screenshots': str(work_dir / 'screenshots'),
+            'ipcache': str(work_dir / 'ip_cache.json'),
+            'database': str(work_dir / 'smartbot.db'),
+            'profiles': str(work_dir / 'profiles'),
+        },
+        'ott_services': {
+            service: dict(server.service_config(service, scenario), interval_seconds=interval)
+            for service in services
+        },
+        'telegram': {'bot_token': '', 'chat_id': ''},
+        'api': {'host': '127.0.0.1', 'port': 0},
+        'loop_interval_seconds': interval,
+        'scheduler': {'jitter': 0},
+        'max_retries': 10 ** 6,  # A benchmark of failing IPs shouldn't stop in safe mode
+        'validation': {'policy': 'all', 'order': 'config'},
+        'result_cache': {'ttl_seconds': 900 if use_cache else 0, 'max_entries': 256, 'mode': 'probe'},
+        'watchdog': {'check_deadline_seconds': 120, 'breaker_threshold': 3, 'breaker_cooldown_seconds': 600},
+    }
+
+def _count_rows(db_path, since_id=0):
+    conn = sqlite3.connect(f'file:{db_path}?mode=ro', uri=True)
+    try:
+        rows = conn.execute('SELECT id, event_type, details FROM events WHERE id > ?', (since_id,)).fetchall()
+    finally:
+        conn.close()
+    return rows
+
+def bench_loop(server, services, scenario, duration, work_dir, interval, use_cache):
+    """Runs SmartBot.run for `duration` seconds and measures what it got done."""
+    from smartbot import SmartBot
+    config = loop_config(server, services, scenario, work_dir, interval, use_cache)
+    Path(config['paths']['screenshots']).mkdir(parents=True, exist_ok=True)
+    bot = SmartBot(config)
+    db_path = config['paths']['database']
+    first_id = max([row[0] for row in _count_rows(db_path)], default=0)
+    started = time.monotonic()
+    with RssSampler() as sampler:
+        threading.Thread(target=bot.run, kwargs={'start_api': False}, name='bot', daemon=True).start()
+        time.sleep(duration)
+        bot.pause()
+        elapsed = time.monotonic() - started
+        rows = _count_rows(db_path, first_id)
+    durations = []
+    for _, event_type, details in rows:
+        if event_type == 'ott_check':
+            data = json.loads(details)
+            if not data.get('cached'):
+                durations.append(data['duration_ms'])
+    report = _summary(durations, elapsed, sampler.peak)
+    report['db_writes_per_sec'] = round(len(rows) / elapsed, 2)
+    report['rotations'] = sum(1 for _, event_type, _ in rows if event_type == 'rotation')
+    return report
+
+def compare(report, baseline, tolerance):
+    """Prints metric-by-metric changes. Returns the metrics that regressed beyond tolerance."""
+    regressions = []
+    for metric, higher_is_better in HIGHER_IS_BETTER.items():
+        current, previous = report.get(metric), baseline.get(metric)
+        if current is None or not previous:
+            continue
+        change = (current - previous) / previous
+        regressed = higher_is_better is not None and (change < -tolerance if higher_is_better else change > tolerance)
+        if regressed:
+            regressions.append(metric)
+        print(f"  {metric:18} {previous:>10} -> {current:<10} {change:+.1%}{'  REGRESSION' if regressed else ''}")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description='Offline SmartBot benchmark against mock OTT sites.')
+    parser.add_argument('target', choices=('checks', 'loop'))
+    parser.add_argument('--services', default=','.join(DRM_LICENSE_HOSTS), help='comma separated service names')
+    parser.add_argument('--scenarios', default=','.join(EXPECTED), help='mock pages for "checks"')
+    parser.add_argument('--scenario', default='player', choices=sorted(EXPECTED), help='mock page every service uses in "loop"')
+    parser.add_argument('--repeat', type=int, default=1)
+    parser.add_argument('--duration', type=float, default=300, help='seconds to run the loop')
+    parser.add_argument('--interval', type=int, default=5, help='per-service check interval in the loop')
+    parser.add_argument('--cache', action='store_true', help='keep the pass-result cache enabled in the loop')
+    parser.add_argument('--slow-delay', type=float, default=5)
+    parser.add_argument('--work-dir', help='where the loop keeps its DB/screenshots (default: a temp dir)')
+    parser.add_argument('--baseline-dir', default='benchmarks')
+    parser.add_argument('--save-baseline', metavar='NAME')
+    parser.add_argument('--compare', metavar='NAME')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='allowed relative regression')
+    args = parser.parse_args()
+
+    services = [s for s in args.services.split(',') if s]
+    work_dir = Path(args.work_dir or tempfile.mkdtemp(prefix='smartbot-bench-'))
+    work_dir.mkdir(parents=True, exist_ok=True)
+    with MockOttServer() as server:
+        if args.target == 'checks':
+            scenarios = [s for s in args.scenarios.split(',') if s]
+            report = bench_checks(server, services, scenarios, args.repeat, work_dir, args.slow_delay)
+        else:
+            report = bench_loop(server, services, args.scenario, args.duration, work_dir, args.interval, args.cache)
+    report['target'] = args.target
+    report['recorded_at'] = time.strftime('%Y-%m-%dT%H:%M:%S')
+    print(json.dumps(report, indent=2))
+
+    baseline_dir = Path(args.baseline_dir)
+    if args.save_baseline:
+        baseline_dir.mkdir(parents=True, exist_ok=True)
+        path = baseline_dir / f'{args.save_baseline}_{args.target}.json'
+        path.write_text(json.dumps(report, indent=2))
+        print(f"Baseline saved to {path}")
+    if args.compare:
+        path = baseline_dir / f'{args.compare}_{args.target}.json'
+        baseline = json.loads(path.read_text())
+        print(f"Compared with {path} ({baseline.get('recorded_at')}):")
+        if compare(report, baseline, args.tolerance):
+            sys.exit(1)
+    if report.get('mismatches'):
+        sys.exit(2)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,137 @@
+import contextvars
+import logging
+import os
+import signal
+import threading
+import time
+
+import procfs
+
+logger = logging.getLogger('SmartBot')
+
+class CheckCancelled(BaseException):
+    """
+    Raised inside a check once the watchdog has cancelled it. Not an Exception, so the
+    checks' broad `except Exception` retry blocks don't swallow it.
+    """
+
+class CheckHandle:
+    """
+    Passed into a running check so it can register teardown callbacks (close the
+    driver, kill the browser). The watchdog runs them from outside the check when the
+    deadline passes.
+    """
+
+    def __init__(self):
+        self.cancelled = threading.Event()
+        self._cleanups = []
+        self._lock = threading.Lock()
+
+    def on_cancel(self, callback):
+        with self._lock:
+            self._cleanups.append(callback)
+
+    def sleep(self, seconds):
+        """Waits like time.sleep, but raises CheckCancelled as soon as the check is cancelled."""
+        if self.cancelled.wait(seconds):
+            raise CheckCancelled("Check was cancelled")
+
+    def cancel(self):
+        self.cancelled.set()
+        with self._lock:
+            cleanups, self._cleanups = self._cleanups, []
+        for callback in reversed(cleanups):
+            try:
+                callback()
+            except Exception as e:
+                logger.warning(f"Check cleanup failed: {e}")
+
+def run_with_deadline(func, deadline_seconds, *args, grace_seconds=10, **kwargs):
+    """
+    Runs func(*args, handle=..., **kwargs) in a worker thread and waits at most
+    `deadline_seconds` for it. Returns (True, result) if it finished, otherwise cancels
+    the handle (tearing down whatever the check registered) and returns (False, None).
+    """
+    handle = CheckHandle()
+    outcome = {}
+
+    def worker():
+        try:
+            outcome['result'] = func(*args, handle=handle, **kwargs)
+        except BaseException as e:
+            outcome['error'] = e
+
+    # Carry the caller's context (e.g. the log_pipeline check tags) into the worker thread
+    context = contextvars.copy_context()
+    thread = threading.Thread(target=context.run, args=(worker,), name='check', daemon=True)
+    thread.start()
+    thread.join(deadline_seconds)
+    if not thread.is_alive():
+        if 'error' in outcome:
+            raise outcome['error']
+        return True, outcome['result']
+
+    handle.cancel()
+    thread.join(grace_seconds)
+    if thread.is_alive():
+        logger.error(f"Check thread still running {grace_seconds}s after cancellation; abandoning it.")
+    return False, None
+
+def kill_processes(pids):
+    killed = []
+    for pid in pids:
+        try:
+            os.kill(pid, signal.SIGKILL)
+            killed.append(pid)
+        except OSError:
+            pass
+    return killed
+
+BROWSER_PROCESS_PATTERNS = ('playwright', 'chrom', 'headless_shell')
+
+def kill_browser_processes():
+    """Kills the Playwright driver and browser processes started by this process."""
+    killed = kill_processes(procfs.find_descendants(patterns=BROWSER_PROCESS_PATTERNS))
+    if killed:
+        logger.warning(f"Killed {len(killed)} browser process(es): {killed}")
+    return killed
+
+class CircuitBreaker:
+    """
+    Stops scheduling a service after `threshold` consecutive timeouts. Once `cooldown`
+    seconds have passed the next check is let through as a probe; if it completes the
+    breaker closes, if it times out again the breaker re-opens.
+    """
+
+    def __init__(self, threshold=3, cooldown=600):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.timeouts = 0
+        self.opened_at = None
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return 'closed'
+        return 'half_open' if time.monotonic() - self.opened_at >= self.cooldown else 'open'
+
+    def allow(self):
+        return self.state != 'open'
+
+    def remaining(self):
+        if self.opened_at is None:
+            return 0
+        return max(0.0, self.cooldown - (time.monotonic() - self.opened_at))
+
+    def record(self, timed_out):
+        """Returns True if this result just opened the breaker."""
+        if not timed_out:
+            self.timeouts = 0
+            self.opened_at = None
+            return False
+        was_probe = self.state == 'half_open'
+        self.timeouts += 1
+        if was_probe or self.timeouts >= self.threshold:
+            self.opened_at = time.monotonic()
+            return True
+        return False
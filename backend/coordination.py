@@ -0,0 +1,252 @@
+import json
+import logging
+import os
+import socket
+import sqlite3
+import threading
+import time
+
+logger = logging.getLogger('SmartBot')
+
+# Optional multi-node coordination ("coordination": {"enabled": true, ...} in config.json).
+# Nodes share a state store holding:
+#   - IP reputation (good/bad verdicts from any node)
+#   - recent check results, so a pass on (service, IP) seen by one node can be reused by another
+#   - leases on (service, device) work items, so two nodes never drive the same check at once
+#   - node heartbeats with each node's status, for the aggregated dashboard view
+# "backend": "sqlite" is a single-host stand-in (one shared file, also used for tests);
+# "redis" is for nodes on different hosts and needs the redis package.
+
+RESULTS_KEPT = 1000
+
+class SqliteStore:
+    """Shared store in one SQLite file. Only valid for nodes on the same host."""
+
+    def __init__(self, path):
+        self.conn = sqlite3.connect(path, check_same_thread=False, timeout=10, isolation_level=None)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self._lock = threading.Lock()
+        self.conn.executescript('''
+            CREATE TABLE IF NOT EXISTS ip_reputation (ip TEXT PRIMARY KEY, status TEXT, node TEXT, updated_at REAL);
+            CREATE TABLE IF NOT EXISTS results (id INTEGER PRIMARY KEY AUTOINCREMENT, node TEXT, service TEXT, ip TEXT, passed INTEGER, at REAL);
+            CREATE INDEX IF NOT EXISTS idx_results_pair ON results (service, ip, at);
+            CREATE TABLE IF NOT EXISTS leases (key TEXT PRIMARY KEY, owner TEXT, expires_at REAL);
+            CREATE TABLE IF NOT EXISTS nodes (node TEXT PRIMARY KEY, status TEXT, seen_at REAL);
+        ''')
+
+    def _execute(self, sql, params=()):
+        with self._lock:
+            return self.conn.execute(sql, params).fetchall()
+
+    def set_ip_status(self, ip, status, node):
+        self._execute('INSERT OR REPLACE INTO ip_reputation VALUES (?, ?, ?, ?)', (ip, status, node, time.time()))
+
+    def get_ip_status(self, ip):
+        rows = self._execute('SELECT status FROM ip_reputation WHERE ip = ?', (ip,))
+        return rows[0][0] if rows else None
+
+    def ip_reputation(self):
+        return {ip: {'status': status, 'node': node, 'updated_at': at}
+                for ip, status, node, at in self._execute('SELECT ip, status, node, updated_at FROM ip_reputation')}
+
+    def add_result(self, node, service, ip, passed):
+        with self._lock:
+            self.conn.execute('INSERT INTO results (node, service, ip, passed, at) VALUES (?, ?, ?, ?, ?)',
+                              (node, service, ip, int(passed), time.time()))
+            self.conn.execute('DELETE FROM results WHERE id <= (SELECT MAX(id) FROM results) - ?', (RESULTS_KEPT,))
+
+    def last_result(self, service, ip):
+        rows = self._execute('SELECT node, passed, at FROM results WHERE service = ? AND ip = ? ORDER BY at DESC LIMIT 1', (service, ip))
+        return {'node': rows[0][0], 'passed': bool(rows[0][1]), 'at': rows[0][2]} if rows else None
+
+    def recent_results(self, limit=100):
+        rows = self._execute('SELECT node, service, ip, passed, at FROM results ORDER BY id DESC LIMIT ?', (limit,))
+        return [{'node': n, 'service': s, 'ip': ip, 'passed': bool(p), 'at': at} for n, s, ip, p, at in rows]
+
+    def acquire_lease(self, key, owner, ttl):
+        now = time.time()
+        # Take the lease if it is free, expired or already ours (then it is extended)
+        self._execute('''
+            INSERT INTO leases VALUES (?, ?, ?)
+            ON CONFLICT(key) DO UPDATE SET owner = excluded.owner, expires_at = excluded.expires_at
+            WHERE leases.owner = excluded.owner OR leases.expires_at < ?
+        ''', (key, owner, now + ttl, now))
+        rows = self._execute('SELECT owner, expires_at FROM leases WHERE key = ?', (key,))
+        return rows[0][0] == owner, rows[0][1] - now
+
+    def release_lease(self, key, owner):
+        self._execute('DELETE FROM leases WHERE key = ? AND owner = ?', (key, owner))
+
+    def heartbeat(self, node, status):
+        self._execute('INSERT OR REPLACE INTO nodes VALUES (?, ?, ?)', (node, json.dumps(status), time.time()))
+
+    def nodes(self):
+        return {node: {'status': json.loads(status), 'seen_at': seen_at}
+                for node, status, seen_at in self._execute('SELECT node, status, seen_at FROM nodes')}
+
+class RedisStore:
+    """Shared store in Redis, for nodes on different hosts."""
+
+    # Deletes a lease only if we still own it
+    _RELEASE_SCRIPT = "if redis.call('get', KEYS[1]) == ARGV[1] then return redis.call('del', KEYS[1]) end return 0"
+
+    def __init__(self, url, prefix='smartbot'):
+        import redis
+        self.redis = redis.Redis.from_url(url, decode_responses=True)
+        self.prefix = prefix
+        self._release = self.redis.register_script(self._RELEASE_SCRIPT)
+
+    def _key(self, *parts):
+        return ':'.join((self.prefix,) + parts)
+
+    def set_ip_status(self, ip, status, node):
+        self.redis.hset(self._key('ip_reputation'), ip, json.dumps({'status': status, 'node': node, 'updated_at': time.time()}))
+
+    def get_ip_status(self, ip):
+        entry = self.redis.hget(self._key('ip_reputation'), ip)
+        return json.loads(entry)['status'] if entry else None
+
+    def ip_reputation(self):
+        return {ip: json.loads(entry) for ip, entry in self.redis.hgetall(self._key('ip_reputation')).items()}
+
+    def add_result(self, node, service, ip, passed):
+        entry = json.dumps({'node': node, 'service': service, 'ip': ip, 'passed': bool(passed), 'at': time.time()})
+        pipe = self.redis.pipeline()
+        pipe.lpush(self._key('results'), entry)
+        pipe.ltrim(self._key('results'), 0, RESULTS_KEPT - 1)
+        pipe.hset(self._key('last_result'), f'{service}|{ip}', entry)
+        pipe.execute()
+
+    def last_result(self, service, ip):
+        entry = self.redis.hget(self._key('last_result'), f'{service}|{ip}')
+        return json.loads(entry) if entry else None
+
+    def recent_results(self, limit=100):
+        return [json.loads(entry) for entry in self.redis.lrange(self._key('results'), 0, limit - 1)]
+
+    def acquire_lease(self, key, owner, ttl):
+        lease = self._key('lease', key)
+        ttl_ms = int(ttl * 1000)
+        if self.redis.set(lease, owner, nx=True, px=ttl_ms):
+            return True, ttl
+        if self.redis.get(lease) == owner:
+            self.redis.pexpire(lease, ttl_ms)
+            return True, ttl
+        return False, max(0, self.redis.pttl(lease)) / 1000
+
+    def release_lease(self, key, owner):
+        self._release(keys=[self._key('lease', key)], args=[owner])
+
+    def heartbeat(self, node, status):
+        self.redis.hset(self._key('nodes'), node, json.dumps({'status': status, 'seen_at': time.time()}))
+
+    def nodes(self):
+        return {node: json.loads(entry) for node, entry in self.redis.hgetall(self._key('nodes')).items()}
+
+STORES = {
+    'sqlite': lambda c: SqliteStore(c.get('path', 'coordination.db')),
+    'redis': lambda c: RedisStore(c.get('url', 'redis://localhost:6379/0'), c.get('prefix', 'smartbot')),
+}
+
+class Coordinator:
+    """
+    A node's view of the shared store: its identity, its device and its leases. When the
+    store can't be reached the node carries on alone: claims succeed, nothing is shared.
+    """
+
+    def __init__(self, store, node_id, device, lease_seconds=300, heartbeat_seconds=10, node_timeout=60):
+        self.store = store
+        self.node_id = node_id
+        self.device = device
+        self.lease_seconds = lease_seconds
+        self.heartbeat_seconds = heartbeat_seconds
+        self.node_timeout = node_timeout
+
+    @classmethod
+    def from_config(cls, config):
+        """Returns a Coordinator, or None when coordination isn't enabled."""
+        coordination = config.get('coordination', {})
+        if not coordination.get('enabled'):
+            return None
+        backend = coordination.get('backend', 'sqlite')
+        if backend not in STORES:
+            raise ValueError(f"Unknown coordination backend '{backend}', expected one of {tuple(STORES)}")
+        node_id = coordination.get('node_id') or f'{socket.gethostname()}-{os.getpid()}'
+        return cls(
+            STORES[backend](coordination),
+            node_id,
+            coordination.get('device') or node_id,
+            coordination.get('lease_seconds', 300),
+            coordination.get('heartbeat_seconds', 10),
+            coordination.get('node_timeout_seconds', 60),
+        )
+
+    def _work_key(self, service):
+        return f'{service}@{self.device}'
+
+    def _call(self, fallback, method, *args):
+        """
+        Calls a store method (by name, or a function reading the store), returning `fallback`
+        (the local-only answer) if the store fails.
+        """
+        func = method if callable(method) else getattr(self.store, method)
+        try:
+            return func(*args)
+        except Exception as e:
+            logger.warning(f"Coordination store unavailable ({getattr(func, '__name__', method)}: {e}); continuing without it.")
+            return fallback
+
+    def claim(self, service, ttl=None):
+        """Leases (service, device) for one check. Returns (claimed, seconds until the current lease ends)."""
+        return self._call((True, 0), 'acquire_lease', self._work_key(service), self.node_id, ttl or self.lease_seconds)
+
+    def release(self, service):
+        self._call(None, 'release_lease', self._work_key(service), self.node_id)
+
+    def flag_ip(self, ip, status):
+        self._call(None, 'set_ip_status', ip, status, self.node_id)
+
+    def ip_status(self, ip):
+        return self._call(None, 'get_ip_status', ip)
+
+    def publish_result(self, service, ip, passed):
+        self._call(None, 'add_result', self.node_id, service, ip, passed)
+
+    def shared_pass(self, service, ip, max_age):
+        """The latest result for (service, IP) if it is a pass by another node within max_age seconds."""
+        result = self._call(None, 'last_result', service, ip)
+        if result and result['passed'] and result['node'] != self.node_id and time.time() - result['at'] <= max_age:
+            return result
+        return None
+
+    def start_heartbeat(self, get_status):
+        def beat():
+            while True:
+                try:
+                    self.store.heartbeat(self.node_id, get_status())
+                except Exception as e:
+                    logger.warning(f"Coordination heartbeat failed: {e}")
+                time.sleep(self.heartbeat_seconds)
+        threading.Thread(target=beat, name='coordination-heartbeat', daemon=True).start()
+
+    def cluster_snapshot(self, results_limit=100):
+        """
+        Aggregated view for the dashboard: live nodes, recent results from every node, IP
+        reputation. Only this node's identity when the store can't be reached.
+        """
+        local = {'node_id': self.node_id, 'nodes': {}, 'results': [], 'ip_reputation': {}, 'store_available': False}
+        return self._call(local, self._read_cluster, results_limit)
+
+    def _read_cluster(self, results_limit):
+        now = time.time()
+        nodes = self.store.nodes()
+        return {
+            'node_id': self.node_id,
+            'nodes': {
+                node: dict(entry, alive=now - entry['seen_at'] <= self.node_timeout)
+                for node, entry in nodes.items()
+            },
+            'results': self.store.recent_results(results_limit),
+            'ip_reputation': self.store.ip_reputation(),
+            'store_available': True,
+        }
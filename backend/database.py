@@ -1,10 +1,14 @@
 import sqlite3
 import logging
 
+import metrics
+
 logger = logging.getLogger('SmartBot')
 
 def setup_database(db_path):
     conn = sqlite3.connect(db_path, check_same_thread=False)
+    # WAL lets the API's read-only connections read while the bot writes
+    conn.execute('PRAGMA journal_mode=WAL')
     cursor = conn.cursor()
     cursor.execute('''
         CREATE TABLE IF NOT EXISTS events (
@@ -14,16 +18,21 @@ def setup_database(db_path):
             details TEXT
         )
     ''')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_events_type ON events (event_type, id)')
     conn.commit()
     return conn
 
 def log_event(conn, event_type, details):
+    metrics.db_writes_in_flight.inc()
     try:
-        cursor = conn.cursor()
-        cursor.execute("INSERT INTO events (event_type, details) VALUES (?, ?)", (event_type, details))
-        conn.commit()
+        with metrics.db_write_duration.time():
+            cursor = conn.cursor()
+            cursor.execute("INSERT INTO events (event_type, details) VALUES (?, ?)", (event_type, details))
+            conn.commit()
     except Exception as e:
         logger.error(f"Failed to log event to database: {e}")
+    finally:
+        metrics.db_writes_in_flight.dec()
 
 def get_recent_logs(conn, limit=100):
     try:
@@ -32,4 +41,13 @@ def get_recent_logs(conn, limit=100):
         return cursor.fetchall()
     except Exception as e:
         logger.error(f"Failed to fetch logs from database: {e}")
-        return [] 
\ No newline at end of file
+        return [] 
+
+def get_recent_events(conn, event_type, limit=100):
+    try:
+        cursor = conn.cursor()
+        cursor.execute("SELECT timestamp, event_type, details FROM events WHERE event_type = ? ORDER BY id DESC LIMIT ?", (event_type, limit))
+        return cursor.fetchall()
+    except Exception as e:
+        logger.error(f"Failed to fetch {event_type} events from database: {e}")
+        return []
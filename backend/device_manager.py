@@ -1,5 +1,8 @@
 # Simulated Device Manager for Windows
 # In real deployment, this would control SIM/dongle hardware
+import logging
+import threading
+import time
 
 fake_ips = [
     '203.0.113.10',
@@ -12,17 +15,31 @@ fake_ips = [
 current_ip_index = 0
 last_known_good_ip = None
 
+# Cached device state, so status reads don't query the modem. Refreshed by real device
+# queries and rotations, and by a background refresher once it is older than STATE_TTL.
+STATE_TTL = 30
+_state = {}
+_state_at = None
+_state_lock = threading.Lock()
+_listeners = []
+
 def get_current_ip():
-    return fake_ips[current_ip_index]
+    ip = fake_ips[current_ip_index]
+    _update_state(ip=ip)
+    return ip
 
 def rotate_ip():
     global current_ip_index
     current_ip_index = (current_ip_index + 1) % len(fake_ips)
-    return fake_ips[current_ip_index]
+    ip = fake_ips[current_ip_index]
+    _update_state(ip=ip)
+    return ip
 
 def device_health():
     # Always healthy in simulation
-    return True
+    healthy = True
+    _update_state(healthy=healthy)
+    return healthy
 
 def get_last_known_good_ip():
     return last_known_good_ip
@@ -30,3 +47,46 @@ def get_last_known_good_ip():
 def set_last_known_good_ip(ip):
     global last_known_good_ip
     last_known_good_ip = ip
+    _update_state(last_known_good_ip=ip)
+
+def subscribe(callback):
+    """Calls callback(changes) with the changed fields whenever the device state changes."""
+    _listeners.append(callback)
+
+def get_state():
+    """Cached device state (ip, healthy, last_known_good_ip). Never queries the device."""
+    with _state_lock:
+        return dict(_state)
+
+def refresh_state(max_age=STATE_TTL):
+    """Re-reads the device if the cached state is older than `max_age` seconds."""
+    with _state_lock:
+        fresh = _state_at is not None and time.monotonic() - _state_at <= max_age
+    if not fresh:
+        get_current_ip()
+        device_health()
+
+def start_refresher(interval=STATE_TTL):
+    """Keeps the cached state at most `interval` seconds old, also while the bot loop is paused."""
+    def refresh():
+        while True:
+            try:
+                refresh_state(interval)
+            except Exception as e:
+                logging.getLogger('SmartBot').warning(f"Device state refresh failed: {e}")
+            time.sleep(interval)
+    threading.Thread(target=refresh, name='device-state', daemon=True).start()
+
+def _update_state(**fields):
+    global _state_at
+    with _state_lock:
+        changes = {key: value for key, value in fields.items() if _state.get(key, object()) != value}
+        _state.update(fields)
+        _state_at = time.monotonic()
+    if changes:
+        for callback in list(_listeners):
+            # A failing listener must not break the device call that changed the state
+            try:
+                callback(changes)
+            except Exception as e:
+                logging.getLogger('SmartBot').warning(f"Device state listener failed: {e}")
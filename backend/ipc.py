@@ -0,0 +1,177 @@
+import itertools
+import logging
+import logging.handlers
+import os
+import queue
+import time
+from pathlib import Path
+
+import check_watchdog
+import log_pipeline
+import metrics
+import procfs
+import resource_governor
+
+logger = logging.getLogger('SmartBot')
+
+# Multi-process layout (process_mode: "multi"):
+#   coordinator  - the SmartBot loop; owns device/IP state, the scheduler and DB writes
+#   API process  - Flask-SocketIO; re-broadcasts coordinator events, forwards controls back
+#   checker pool - worker processes that run check_ott jobs
+# They talk over multiprocessing queues. Events are (name, payload) tuples; names starting
+# with '__' are internal snapshots for the API process and are never sent to clients.
+
+class QueueEmitter:
+    """Drop-in for SocketIO.emit in the coordinator: events go to the API process instead."""
+
+    def __init__(self, events_queue):
+        self.events_queue = events_queue
+
+    def emit(self, event, data=None):
+        metrics.socketio_emits.inc(event)
+        self.push(event, data)
+
+    def push(self, event, data):
+        try:
+            self.events_queue.put_nowait((event, data))
+        except queue.Full:
+            pass  # The dashboard can miss an event; the loop must not block on it
+
+class _ForwardToLogger(logging.Handler):
+    def emit(self, record):
+        logging.getLogger(record.name).handle(record)
+
+def _checker_worker_main(config, jobs, results, log_queue):
+    # Runs in a fresh (spawned) process: only the modules a check needs get imported here
+    worker_logger = logging.getLogger('SmartBot')
+    worker_logger.handlers[:] = [log_pipeline.worker_handler(log_queue)]
+    worker_logger.setLevel(logging.INFO)
+    worker_logger.propagate = False
+
+    from ott_checker import check_ott, load_classification_rules, preload_backends
+    load_classification_rules(config.get('ott_services', {}))
+    try:
+        preload_backends(config.get('ott_services', {}))
+    except ImportError as e:
+        worker_logger.error(f"Checker backend unavailable: {e}")
+    governor = resource_governor.configure(config)
+
+    def report(reason, limit_kills_before):
+        # The coordinator folds this into its own governor and metrics (see CheckerPool.run)
+        return {
+            'reason': reason,
+            'reaped': governor.reap(reason),
+            'limit_kills': {limit: count - limit_kills_before.get(limit, 0)
+                            for limit, count in governor.limit_kills.items() if count > limit_kills_before.get(limit, 0)},
+            'open_browsers': metrics.open_browsers.value(),
+            'pid': os.getpid(),
+        }
+
+    results.put((None, None, None, report('startup', {})))
+    screenshots_dir = Path(config['paths'].get('screenshots', 'screenshots'))
+    while True:
+        job = jobs.get()
+        if job is None:
+            break
+        job_id, service, service_config, deadline, check_context = job
+        # Tags the worker's records for this check like the coordinator's (service, ip, check_id)
+        context_token = log_pipeline.set_check_context(**check_context)
+        limit_kills_before = dict(governor.limit_kills)
+        try:
+            finished, result = check_watchdog.run_with_deadline(
+                check_ott, deadline, service, service_config, screenshots_dir, worker_logger
+            )
+        except Exception as e:
+            worker_logger.error(f"Checker worker crashed on {service}: {e}", exc_info=True)
+            finished, result = True, {
+                'success': False,
+                'error': str(e),
+                'drm_handshake_detected': False,
+                'final_screenshot_path': None,
+                'drm_screenshot_path': None,
+            }
+        log_pipeline.reset_check_context(context_token)
+        results.put((job_id, finished, result, report('post_check', limit_kills_before)))
+
+class _Worker:
+    def __init__(self, ctx, config, results, log_queue, index):
+        self.jobs = ctx.Queue()
+        self.process = ctx.Process(
+            target=_checker_worker_main,
+            args=(config, self.jobs, results, log_queue),
+            name=f'smartbot-checker-{index}',
+            daemon=True,
+        )
+        self.process.start()
+
+    def kill(self):
+        # Take the worker's browsers/drivers down with it
+        check_watchdog.kill_processes(procfs.find_descendants(self.process.pid))
+        self.process.kill()
+        self.process.join(5)
+
+class CheckerPool:
+    """
+    Pool of checker worker processes. Checks are dispatched one at a time (they share the
+    coordinator's current IP and validation policy); extra workers stay warm so a hung
+    worker can be killed and replaced without waiting for a new process to start.
+    """
+
+    def __init__(self, ctx, config, size=1, grace_seconds=15):
+        self.ctx = ctx
+        self.config = config
+        self.grace_seconds = grace_seconds
+        self.results = ctx.Queue()
+        self.log_queue = ctx.Queue()
+        self._listener = logging.handlers.QueueListener(self.log_queue, _ForwardToLogger())
+        self._listener.start()
+        self._ids = itertools.count()
+        self._index = itertools.count()
+        self._open_browsers = {}
+        self._workers = [self._spawn() for _ in range(max(1, size))]
+
+    def _spawn(self):
+        return _Worker(self.ctx, self.config, self.results, self.log_queue, next(self._index))
+
+    def run(self, service, service_config, deadline):
+        """Runs one check on a worker. Returns (finished, result) like run_with_deadline."""
+        worker = self._workers[0]
+        if not worker.process.is_alive():
+            logger.warning(f"Checker worker {worker.process.name} died, replacing it.")
+            worker = self._replace(worker)
+        job_id = next(self._ids)
+        worker.jobs.put((job_id, service, service_config, deadline, log_pipeline.get_check_context()))
+        # The worker enforces the deadline itself; the extra grace covers a worker that is wedged
+        wait_until = time.monotonic() + deadline + self.grace_seconds
+        while True:
+            try:
+                result_id, finished, result, report = self.results.get(timeout=max(0, wait_until - time.monotonic()))
+            except queue.Empty:
+                logger.error(f"Checker worker {worker.process.name} unresponsive on {service}; killing it.")
+                self._replace(worker)
+                return False, None
+            self._merge(report)
+            if result_id == job_id:
+                # Rotate so the next job goes to a worker that has been idle
+                self._workers.append(self._workers.pop(0))
+                return finished, result
+
+    def _merge(self, report):
+        resource_governor.get_governor().merge(report)
+        self._open_browsers[report['pid']] = report['open_browsers']
+        metrics.open_browsers.set(sum(self._open_browsers.values()))
+
+    def _replace(self, worker):
+        self._open_browsers.pop(worker.process.pid, None)
+        metrics.open_browsers.set(sum(self._open_browsers.values()))
+        worker.kill()
+        replacement = self._spawn()
+        self._workers[self._workers.index(worker)] = replacement
+        return replacement
+
+    def shutdown(self):
+        for worker in self._workers:
+            worker.jobs.put(None)
+        for worker in self._workers:
+            worker.process.join(5)
+        self._listener.stop()
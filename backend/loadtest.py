@@ -0,0 +1,319 @@
+#!/usr/bin/env python3
+"""
+Load test for the API (backend/api.py), the dashboard proxy (frontend/app.py) and the
+Socket.IO fan-out, against a bot whose checks are simulated.
+
+  python3 loadtest.py serve                                  # simulated bot + API on :5000
+  python3 ../frontend/app.py                                 # dashboard proxy on :80
+  python3 loadtest.py run --sessions 50 --duration 120 --backend-pid <pid> --frontend-pid <pid>
+
+Each simulated session logs in to the dashboard, polls the same endpoints the dashboard
+loads, and holds a Socket.IO connection to the backend like the dashboard page does. The
+simulated bot emits a timestamped 'loadtest_probe' event every second through the normal
+broadcast path, so event delivery lag and loss can be measured (sender and clients must
+share a clock, i.e. run on the same host).
+
+Reports request latency percentiles and errors per endpoint, event delivery lag and ratio,
+and CPU/RSS of the given backend/frontend processes (including their children).
+"""
+
+import argparse
+import base64
+import json
+import os
+import random
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+import requests
+
+import procfs
+from benchmark import percentile
+
+DASHBOARD_ENDPOINTS = ('/api/status', '/api/logs', '/api/ott_checks', '/api/drm_handshakes', '/api/screenshots')
+DASHBOARD_EVENTS = ('status_update', 'log_stream', 'new_db_log', 'ott_check', 'drm_handshake', 'new_screenshot')
+PROBE_EVENT = 'loadtest_probe'
+
+# 1x1 PNG written as the simulated checks' screenshot
+PLACEHOLDER_PNG = base64.b64decode(
+    'iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAQAAAC1HAwCAAAAC0lEQVR42mNkYAAAAAYAAjCB0C8AAAAASUVORK5CYII='
+)
+
+# --- Simulated backend ---
+
+def simulated_bot_class():
+    from smartbot import SmartBot
+
+    class SimulatedBot(SmartBot):
+        """SmartBot whose checks sleep instead of driving a browser, writing a placeholder screenshot."""
+
+        check_seconds = (2, 6)
+        drm_rate = 0.5
+        probe_interval = 1.0
+
+        def run_check(self, service, service_config, deadline, trace):
+            trace.phase('simulated')
+            time.sleep(random.uniform(*self.check_seconds))
+            screenshot = self.screenshots_dir / f'shot_{service}_{time.strftime("%Y%m%d_%H%M%S")}_final.png'
+            screenshot.write_bytes(PLACEHOLDER_PNG)
+            trace.end()
+            drm = random.random() < self.drm_rate
+            return True, {
+                'success': True,
+                'classification': 'pass',
+                'drm_handshake_detected': drm,
+                'drm_event': {'url': 'simulated', 'status': 200} if drm else None,
+                'final_screenshot_path': str(screenshot),
+                'drm_screenshot_path': None,
+                'spans': trace.spans,
+            }
+
+        def emit_probes(self):
+            seq = 0
+            while True:
+                self.api_socketio.emit(PROBE_EVENT, {'seq': seq, 'sent_at': time.time()})
+                seq += 1
+                time.sleep(self.probe_interval)
+
+    return SimulatedBot
+
+def serve(args):
+    work_dir = Path(args.work_dir or tempfile.mkdtemp(prefix='smartbot-load-'))
+    config = {
+        'paths': {
+            'log': str(work_dir / 'smartbot.log'),
+            'screenshots': str(work_dir / 'screenshots'),
+            'ipcache': str(work_dir / 'ip_cache.json'),
+            'database': str(work_dir / 'smartbot.db'),
+            'profiles': str(work_dir / 'profiles'),
+        },
+        'ott_services': {
+            name: {'mode': 'browser', 'url': f'http://127.0.0.1/{name}', 'interval_seconds': args.check_interval}
+            for name in ('hotstar', 'sonyliv', 'zee5')
+        },
+        'telegram': {'bot_token': '', 'chat_id': ''},
+        'api': {'host': args.host, 'port': args.port, 'read_pool_size': args.read_pool_size},
+        'loop_interval_seconds': args.check_interval,
+        'max_retries': 10 ** 6,
+        'validation': {'policy': 'all', 'order': 'config'},
+        'result_cache': {'ttl_seconds': 0},
+    }
+    bot = simulated_bot_class()(config)
+    threading.Thread(target=bot.emit_probes, name='probes', daemon=True).start()
+    print(f"Simulated bot serving on {args.host}:{args.port} (pid {os.getpid()}), data in {work_dir}")
+    bot.run()
+
+# --- Load generator ---
+
+class Stats:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencies = {}
+        self.errors = {}
+        self.events = {}
+        self.lags = []
+        self.probes = {}  # client index -> seqs received
+        self.connect_failures = 0
+
+    def request(self, endpoint, ms=None):
+        with self.lock:
+            if ms is None:
+                self.errors[endpoint] = self.errors.get(endpoint, 0) + 1
+            else:
+                self.latencies.setdefault(endpoint, []).append(ms)
+
+    def event(self, client, name, data):
+        received = time.time()
+        with self.lock:
+            self.events[name] = self.events.get(name, 0) + 1
+            if name == PROBE_EVENT:
+                self.lags.append(round((received - data['sent_at']) * 1000, 1))
+                self.probes.setdefault(client, set()).add(data['seq'])
+
+class Session:
+    """One dashboard operator: a logged-in HTTP session polling endpoints plus a Socket.IO subscriber."""
+
+    def __init__(self, index, args, stats, stop):
+        self.index = index
+        self.args = args
+        self.stats = stats
+        self.stop = stop
+        self.http = requests.Session()
+        self.sio = None
+
+    def login(self):
+        if not self.args.frontend:
+            return
+        response = self.http.post(self.args.frontend + '/', data={'username': self.args.user, 'password': self.args.password}, timeout=10)
+        if '/dashboard' not in response.url:
+            raise RuntimeError(f"Login failed for session {self.index}")
+
+    def subscribe(self):
+        import socketio
+        self.sio = socketio.Client(reconnection=False)
+        for name in DASHBOARD_EVENTS + (PROBE_EVENT,):
+            self.sio.on(name, lambda data=None, name=name: self.stats.event(self.index, name, data))
+        try:
+            self.sio.connect(self.args.backend, wait_timeout=10)
+        except Exception:
+            with self.stats.lock:
+                self.stats.connect_failures += 1
+            self.sio = None
+
+    def poll(self):
+        base = self.args.frontend or self.args.backend
+        # Sessions start spread out instead of all hitting the server on the same tick
+        self.stop.wait(random.uniform(0, self.args.poll_interval))
+        while not self.stop.is_set():
+            for endpoint in DASHBOARD_ENDPOINTS:
+                started = time.monotonic()
+                try:
+                    response = self.http.get(base + endpoint, timeout=self.args.timeout)
+                    ok = response.status_code == 200
+                except requests.RequestException:
+                    ok = False
+                self.stats.request(endpoint, round((time.monotonic() - started) * 1000, 1) if ok else None)
+            self.stop.wait(self.args.poll_interval * random.uniform(0.8, 1.2))
+
+    def run(self):
+        try:
+            self.login()
+        except Exception:
+            for endpoint in DASHBOARD_ENDPOINTS:
+                self.stats.request(endpoint)
+            return
+        if self.args.socketio:
+            self.subscribe()
+        self.poll()
+        if self.sio:
+            self.sio.disconnect()
+
+class CpuSampler:
+    """CPU % and RSS of processes (plus their children), sampled every `interval` seconds."""
+
+    def __init__(self, pids, interval=1.0):
+        self.pids = pids
+        self.interval = interval
+        self.samples = {pid: [] for pid in pids}
+        self.peak_rss = {pid: 0 for pid in pids}
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='cpu-sampler', daemon=True)
+
+    def _cpu_seconds(self, pid):
+        return sum(procfs.process_cpu_seconds(p) for p in [pid] + procfs.find_descendants(pid))
+
+    def _run(self):
+        last = {pid: (time.monotonic(), self._cpu_seconds(pid)) for pid in self.pids}
+        while not self._stop.wait(self.interval):
+            for pid in self.pids:
+                now, cpu = time.monotonic(), self._cpu_seconds(pid)
+                then, previous = last[pid]
+                self.samples[pid].append(round((cpu - previous) / (now - then) * 100, 1))
+                last[pid] = (now, cpu)
+                rss = sum(procfs.process_rss_bytes(p) for p in [pid] + procfs.find_descendants(pid))
+                self.peak_rss[pid] = max(self.peak_rss[pid], rss)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+    def report(self):
+        return {
+            pid: {
+                'cpu_avg_pct': round(sum(s) / len(s), 1) if s else None,
+                'cpu_p95_pct': percentile(s, 95),
+                'cpu_peak_pct': max(s, default=None),
+                'peak_rss_mb': round(self.peak_rss[pid] / 2 ** 20, 1),
+            }
+            for pid, s in self.samples.items()
+        }
+
+def run_load(args):
+    stats = Stats()
+    stop = threading.Event()
+    sessions = [Session(i, args, stats, stop) for i in range(args.sessions)]
+    pids = {name: pid for name, pid in (('backend', args.backend_pid), ('frontend', args.frontend_pid)) if pid}
+    threads = []
+    with CpuSampler(list(pids.values())) as cpu:
+        for session in sessions:
+            thread = threading.Thread(target=session.run, name=f'session-{session.index}', daemon=True)
+            thread.start()
+            threads.append(thread)
+            time.sleep(args.ramp_up / max(1, args.sessions))
+        measure_started = time.monotonic()
+        time.sleep(args.duration)
+        stop.set()
+        elapsed = time.monotonic() - measure_started
+        for thread in threads:
+            thread.join(args.timeout + 5)
+
+    report = {'sessions': args.sessions, 'duration_s': round(elapsed, 1), 'endpoints': {}}
+    for endpoint in DASHBOARD_ENDPOINTS:
+        values = stats.latencies.get(endpoint, [])
+        report['endpoints'][endpoint] = {
+            'requests': len(values),
+            'errors': stats.errors.get(endpoint, 0),
+            'rps': round(len(values) / elapsed, 1),
+            'p50_ms': percentile(values, 50),
+            'p95_ms': percentile(values, 95),
+            'p99_ms': percentile(values, 99),
+        }
+    all_seqs = set().union(*stats.probes.values()) if stats.probes else set()
+    expected = (max(all_seqs) - min(all_seqs) + 1) * args.sessions if all_seqs else 0
+    received = sum(len(seqs) for seqs in stats.probes.values())
+    report['events'] = {
+        'received': stats.events,
+        'socketio_connect_failures': stats.connect_failures,
+        'probe_lag_p50_ms': percentile(stats.lags, 50),
+        'probe_lag_p95_ms': percentile(stats.lags, 95),
+        'probe_lag_p99_ms': percentile(stats.lags, 99),
+        'probe_delivery_ratio': round(received / expected, 3) if expected else None,
+    }
+    usage = cpu.report()
+    report['processes'] = {name: usage[pid] for name, pid in pids.items()}
+    return report
+
+def main():
+    parser = argparse.ArgumentParser(description='Load test the SmartBot API and dashboard fan-out.')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    serve_parser = commands.add_parser('serve', help='run a bot with simulated checks and its API')
+    serve_parser.add_argument('--host', default='127.0.0.1')
+    serve_parser.add_argument('--port', type=int, default=5000)
+    serve_parser.add_argument('--check-interval', type=int, default=10, help='seconds between checks of each service')
+    serve_parser.add_argument('--read-pool-size', type=int, default=4)
+    serve_parser.add_argument('--work-dir')
+
+    run_parser = commands.add_parser('run', help='generate dashboard load')
+    run_parser.add_argument('--sessions', type=int, default=20)
+    run_parser.add_argument('--duration', type=float, default=60)
+    run_parser.add_argument('--ramp-up', type=float, default=10, help='seconds over which sessions are started')
+    run_parser.add_argument('--poll-interval', type=float, default=5)
+    run_parser.add_argument('--timeout', type=float, default=10)
+    run_parser.add_argument('--backend', default='http://127.0.0.1:5000')
+    run_parser.add_argument('--frontend', default='http://127.0.0.1:80', help="dashboard URL; '' polls the backend directly")
+    run_parser.add_argument('--user', default='vladislav')
+    run_parser.add_argument('--password', default='smartbot')
+    run_parser.add_argument('--no-socketio', dest='socketio', action='store_false')
+    run_parser.add_argument('--backend-pid', type=int)
+    run_parser.add_argument('--frontend-pid', type=int)
+    run_parser.add_argument('--output', help='also write the report to this JSON file')
+
+    args = parser.parse_args()
+    if args.command == 'serve':
+        serve(args)
+        return
+    args.frontend = args.frontend.rstrip('/')
+    report = run_load(args)
+    print(json.dumps(report, indent=2))
+    if args.output:
+        Path(args.output).write_text(json.dumps(report, indent=2))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,134 @@
+import contextvars
+import copy
+import gzip
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import shutil
+from datetime import datetime
+
+import metrics
+
+# Fields of the check currently running in this context (thread/worker), added to every record
+_check_context = contextvars.ContextVar('check_context', default={})
+
+def set_check_context(**fields):
+    """Tags every log record emitted from this context with the given fields. Returns a reset token."""
+    return _check_context.set(fields)
+
+def reset_check_context(token):
+    _check_context.reset(token)
+
+def get_check_context():
+    return dict(_check_context.get())
+
+class _ContextFilter(logging.Filter):
+    def filter(self, record):
+        for key, value in _check_context.get().items():
+            setattr(record, key, value)
+        return True
+
+class JsonLinesFormatter(logging.Formatter):
+    """One JSON object per line, with the check context (service, ip, check_id) when present."""
+
+    CONTEXT_FIELDS = ('service', 'ip', 'check_id')
+
+    def format(self, record):
+        entry = {
+            'ts': datetime.fromtimestamp(record.created).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'thread': record.threadName,
+            'msg': record.getMessage(),
+        }
+        for field in self.CONTEXT_FIELDS:
+            value = getattr(record, field, None)
+            if value is not None:
+                entry[field] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry['exc'] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False)
+
+class TracebackQueueHandler(logging.handlers.QueueHandler):
+    """
+    QueueHandler that keeps the traceback in exc_text instead of folding it into msg, so
+    formatters on the listener side (JsonLinesFormatter's 'exc') still see it separately.
+    """
+
+    _formatter = logging.Formatter()
+
+    def prepare(self, record):
+        record = copy.copy(record)
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self._formatter.formatException(record.exc_info)
+        record.msg = record.message = record.getMessage()
+        record.args = None
+        record.exc_info = None
+        return record
+
+def worker_handler(log_queue):
+    """Handler for a checker worker process: ships records, tagged with the check context, to `log_queue`."""
+    handler = TracebackQueueHandler(log_queue)
+    handler.addFilter(_ContextFilter())
+    return handler
+
+class SheddingQueueHandler(TracebackQueueHandler):
+    """
+    Never blocks the caller. Above `sample_above` of capacity only one in `sample_rate`
+    records below WARNING is kept; when the queue is full records are dropped.
+    """
+
+    def __init__(self, log_queue, sample_above=0.8, sample_rate=10):
+        super().__init__(log_queue)
+        self.high_water = int(log_queue.maxsize * sample_above) if log_queue.maxsize else 0
+        self.sample_rate = sample_rate
+        self._seen = 0
+
+    def enqueue(self, record):
+        if self.high_water and record.levelno < logging.WARNING and self.queue.qsize() >= self.high_water:
+            self._seen += 1
+            if self._seen % self.sample_rate:
+                metrics.log_records_dropped.inc('sampled')
+                return
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            metrics.log_records_dropped.inc('queue_full')
+
+def _gzip_namer(name):
+    return name + '.gz'
+
+def _gzip_rotator(source, dest):
+    with open(source, 'rb') as src, gzip.open(dest, 'wb') as dst:
+        shutil.copyfileobj(src, dst)
+    os.remove(source)
+
+def file_handler(log_path, log_config):
+    """Size- or time-rotated log file, gzip-compressing rotated files unless disabled."""
+    when = log_config.get('rotate_when')
+    backups = log_config.get('backup_count', 5)
+    if when:
+        handler = logging.handlers.TimedRotatingFileHandler(log_path, when=when, backupCount=backups, encoding='utf-8')
+    else:
+        max_bytes = log_config.get('max_bytes', 10 * 1024 * 1024)
+        handler = logging.handlers.RotatingFileHandler(log_path, maxBytes=max_bytes, backupCount=backups, encoding='utf-8')
+    if log_config.get('compress', True):
+        handler.namer = _gzip_namer
+        handler.rotator = _gzip_rotator
+    return handler
+
+def start(logger, handlers, log_config):
+    """
+    Attaches a non-blocking queue handler to `logger` and starts a listener thread that fans
+    records out to `handlers`. Returns the listener (stop() it before reconfiguring).
+    """
+    log_queue = queue.Queue(maxsize=log_config.get('queue_size', 10000))
+    queue_handler = SheddingQueueHandler(log_queue, log_config.get('sample_above', 0.8), log_config.get('sample_rate', 10))
+    queue_handler.addFilter(_ContextFilter())
+    logger.addHandler(queue_handler)
+    listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+    listener.start()
+    return listener
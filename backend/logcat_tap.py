@@ -0,0 +1,93 @@
+import logging
+import re
+import subprocess
+import threading
+import time
+from collections import deque
+
+logger = logging.getLogger('SmartBot')
+
+# Filtered on the device by logcat itself, everything else is silenced with *:S
+DRM_LOG_TAGS = ['MediaDrm', 'MediaDrmService', 'MediaDrm-JNI', 'DrmManager', 'Widevine', 'WVCdm', 'wvcdm', 'ExoPlayerImpl']
+
+# Messages that mean a license request/response actually went through the CDM
+LICENSE_EXCHANGE_RE = re.compile(
+    r'getKeyRequest|provideKeyResponse|KeyResponse|license (?:request|response)|AddKey|GenerateRequest',
+    re.IGNORECASE,
+)
+
+_LOGCAT_LINE_RE = re.compile(r'^\s*[\d.]+\s+\d+\s+\d+\s+([VDIWEF])\s+([^:]+?)\s*:\s(.*)$')
+
+class LogcatTap:
+    """
+    Background logcat reader for one device, filtered at the source to DRM tags.
+    Keeps the last `buffer_size` lines in a ring buffer so memory stays flat no
+    matter how chatty the device is.
+    """
+
+    def __init__(self, udid, tags=DRM_LOG_TAGS, buffer_size=500):
+        self.udid = udid
+        self.tags = tags
+        self.lines = deque(maxlen=buffer_size)
+        self.dropped = 0
+        self._process = None
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def _command(self):
+        # -T 1 starts at the tail so old buffered lines from a previous check are skipped
+        return ['adb', '-s', self.udid, 'logcat', '-v', 'epoch', '-T', '1'] + [f'{tag}:V' for tag in self.tags] + ['*:S']
+
+    def start(self):
+        with self._lock:
+            if self._thread and self._thread.is_alive():
+                return
+            self._process = subprocess.Popen(
+                self._command(),
+                stdout=subprocess.PIPE,
+                stderr=subprocess.DEVNULL,
+                text=True,
+                errors='replace',
+                bufsize=1,
+            )
+            self._thread = threading.Thread(target=self._read, name=f'logcat-{self.udid}', daemon=True)
+            self._thread.start()
+            logger.info(f"[Android] Logcat tap started for {self.udid}")
+
+    def _read(self):
+        for line in self._process.stdout:
+            m = _LOGCAT_LINE_RE.match(line)
+            if not m:
+                continue
+            if len(self.lines) == self.lines.maxlen:
+                self.dropped += 1
+            # Host receive time, so windows line up with the bot's own clock
+            self.lines.append((time.time(), m.group(2), m.group(3)))
+        logger.warning(f"[Android] Logcat tap for {self.udid} exited")
+
+    def stop(self):
+        with self._lock:
+            if self._process and self._process.poll() is None:
+                self._process.terminate()
+            self._process = None
+
+    def find_license_exchange(self, since, until=None):
+        """Returns the first license exchange seen in [since, until] as a dict, or None."""
+        until = until or time.time()
+        for ts, tag, message in list(self.lines):
+            if since <= ts <= until and LICENSE_EXCHANGE_RE.search(message):
+                return {'timestamp': ts, 'tag': tag, 'message': message.strip()}
+        return None
+
+_taps = {}
+_taps_lock = threading.Lock()
+
+def get_tap(udid):
+    """Returns the running tap for a device, (re)starting it if needed."""
+    with _taps_lock:
+        tap = _taps.get(udid)
+        if tap is None:
+            tap = LogcatTap(udid)
+            _taps[udid] = tap
+    tap.start()
+    return tap
@@ -0,0 +1,176 @@
+import threading
+import time
+
+import procfs
+
+# In-memory Prometheus-style metrics. Recording is a dict update under a per-metric
+# lock; the text exposition format is only built when /metrics is scraped.
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, help_text, labels=()):
+        self.name = name
+        self.help = help_text
+        self.labels = labels
+        self._lock = threading.Lock()
+
+    def _key(self, label_values):
+        if len(label_values) != len(self.labels):
+            raise ValueError(f"{self.name} expects labels {self.labels}")
+        return tuple(str(v) for v in label_values)
+
+    def _format_labels(self, key, extra=None):
+        pairs = list(zip(self.labels, key))
+        if extra:
+            pairs.append(extra)
+        if not pairs:
+            return ''
+        body = ','.join(f'{k}="{_escape(v)}"' for k, v in pairs)
+        return '{' + body + '}'
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} {self.kind}']
+        lines.extend(self._samples())
+        return lines
+
+class Counter(_Metric):
+    kind = 'counter'
+
+    def __init__(self, name, help_text, labels=()):
+        super().__init__(name, help_text, labels)
+        self._values = {}
+
+    def inc(self, *label_values, amount=1):
+        key = self._key(label_values)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def _samples(self):
+        with self._lock:
+            items = list(self._values.items())
+        return [f'{self.name}{self._format_labels(k)} {v}' for k, v in items]
+
+class Gauge(_Metric):
+    kind = 'gauge'
+
+    def __init__(self, name, help_text, labels=(), func=None):
+        super().__init__(name, help_text, labels)
+        self._values = {}
+        self._func = func  # evaluated at scrape time for unlabelled gauges
+
+    def set(self, value, *label_values):
+        key = self._key(label_values)
+        with self._lock:
+            self._values[key] = value
+
+    def inc(self, *label_values, amount=1):
+        key = self._key(label_values)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, *label_values, amount=1):
+        self.inc(*label_values, amount=-amount)
+
+    def value(self, *label_values):
+        with self._lock:
+            return self._values.get(self._key(label_values), 0)
+
+    def _samples(self):
+        if self._func is not None:
+            try:
+                return [f'{self.name} {self._func()}']
+            except Exception:
+                return []
+        with self._lock:
+            items = list(self._values.items())
+        return [f'{self.name}{self._format_labels(k)} {v}' for k, v in items]
+
+class Histogram(_Metric):
+    kind = 'histogram'
+
+    def __init__(self, name, help_text, labels=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help_text, labels)
+        self.buckets = buckets
+        self._values = {}
+
+    def observe(self, value, *label_values):
+        key = self._key(label_values)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = [[0] * len(self.buckets), 0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    entry[0][i] += 1
+                    break
+            entry[1] += value
+            entry[2] += 1
+
+    def time(self, *label_values):
+        return _Timer(self, label_values)
+
+    def _samples(self):
+        with self._lock:
+            items = [(k, list(v[0]), v[1], v[2]) for k, v in self._values.items()]
+        lines = []
+        for key, counts, total, count in items:
+            cumulative = 0
+            for bound, c in zip(self.buckets, counts):
+                cumulative += c
+                lines.append(f'{self.name}_bucket{self._format_labels(key, ("le", bound))} {cumulative}')
+            lines.append(f'{self.name}_bucket{self._format_labels(key, ("le", "+Inf"))} {count}')
+            lines.append(f'{self.name}_sum{self._format_labels(key)} {total}')
+            lines.append(f'{self.name}_count{self._format_labels(key)} {count}')
+        return lines
+
+class _Timer:
+    def __init__(self, histogram, label_values):
+        self.histogram = histogram
+        self.label_values = label_values
+
+    def __enter__(self):
+        self.start = time.monotonic()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.monotonic() - self.start, *self.label_values)
+        return False
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+checks_total = Counter('smartbot_checks_total', 'OTT checks by service and outcome.', ('service', 'outcome'))
+check_duration = Histogram('smartbot_check_duration_seconds', 'OTT check wall-clock duration.', ('service',))
+rotations_total = Counter('smartbot_rotations_total', 'IP rotations by reason.', ('reason',))
+rotation_duration = Histogram('smartbot_rotation_duration_seconds', 'Time spent rotating the IP.')
+safe_mode_entries = Counter('smartbot_safe_mode_entries_total', 'Times the bot entered safe mode.', ('reason',))
+db_write_duration = Histogram('smartbot_db_write_duration_seconds', 'SQLite event write latency.')
+db_writes_in_flight = Gauge('smartbot_db_writes_in_flight', 'SQLite event writes waiting or in progress.')
+telegram_send_duration = Histogram('smartbot_telegram_send_duration_seconds', 'Telegram API call latency.', ('kind',))
+telegram_failures = Counter('smartbot_telegram_failures_total', 'Failed Telegram sends.', ('kind',))
+socketio_emits = Counter('smartbot_socketio_emits_total', 'Socket.IO events emitted.', ('event',))
+socketio_dropped = Counter('smartbot_socketio_dropped_total', 'Socket.IO events dropped because the broadcast queue was full.')
+log_records_dropped = Counter('smartbot_log_records_dropped_total', 'Log records shed by the logging queue.', ('reason',))
+result_cache_lookups = Counter('smartbot_result_cache_lookups_total', 'Result cache lookups by outcome.', ('result',))
+browser_limit_kills = Counter('smartbot_browser_limit_kills_total', 'Browsers killed for exceeding a resource limit.', ('limit',))
+browser_processes_reaped = Counter('smartbot_browser_processes_reaped_total', 'Leftover browser/driver processes reaped.', ('reason',))
+browser_memory_reclaimed = Counter('smartbot_browser_memory_reclaimed_bytes_total', 'Resident memory of reaped browser/driver processes.', ('reason',))
+open_browsers = Gauge('smartbot_open_browsers', 'Headless browsers currently open.')
+process_rss = Gauge('smartbot_process_resident_memory_bytes', 'Resident memory of the bot process.', func=procfs.process_rss_bytes)
+
+REGISTRY = [
+    checks_total, check_duration, rotations_total, rotation_duration, safe_mode_entries,
+    db_write_duration, db_writes_in_flight, telegram_send_duration, telegram_failures,
+    socketio_emits, socketio_dropped, log_records_dropped, result_cache_lookups,
+    browser_limit_kills, browser_processes_reaped, browser_memory_reclaimed, open_browsers, process_rss,
+]
+
+def render():
+    """Renders every registered metric in the Prometheus text exposition format."""
+    lines = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    return '\n'.join(lines) + '\n'
@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for the OTT sites, for offline benchmarks and load tests.
+
+Every service gets the same set of pages under /<service>/:
+  player  - a playing <video> that requests a license from the service's fake license host
+  geo     - a geo-block message
+  slow    - the player page, served after a delay (?delay=seconds, default 5)
+  error   - redirects to /<service>/error-page
+
+License requests go to paths built from DRM_LICENSE_HOSTS (e.g. /widevine-proxy.zee5.com/license),
+so they match the same patterns the checker intercepts on the real sites.
+"""
+
+import argparse
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+from ott_checker import DRM_LICENSE_HOSTS
+
+SCENARIOS = ('player', 'geo', 'slow', 'error')
+
+# 1x1 transparent GIF used as the video poster, so pages don't need any external asset
+_POSTER = (
+    b'GIF89a\x01\x00\x01\x00\x80\x00\x00\x00\x00\x00\xff\xff\xff!\xf9\x04\x01\x00\x00\x00\x00'
+    b',\x00\x00\x00\x00\x01\x00\x01\x00\x00\x02\x02D\x01\x00;'
+)
+
+_PLAYER_PAGE = """<!doctype html>
+<html><head><title>{service} - Watch</title></head>
+<body>
+  <div class="player-container">
+    <video id="player" width="640" height="360" poster="/poster.gif" muted autoplay></video>
+  </div>
+  <script>
+    fetch('{license_path}', {{method: 'POST', body: 'challenge'}}).catch(() => {{}});
+  </script>
+</body></html>
+"""
+
+_GEO_PAGE = """<!doctype html>
+<html><head><title>{service}</title></head>
+<body><h1>Sorry, this content is not available in your region.</h1></body></html>
+"""
+
+_ERROR_PAGE = """<!doctype html>
+<html><head><title>{service} - Error</title></head>
+<body><h1>Something went wrong</h1></body></html>
+"""
+
+def license_path(service):
+    """Local path for a service's first license host pattern (the pattern with its escapes removed)."""
+    pattern = DRM_LICENSE_HOSTS.get(service, DRM_LICENSE_HOSTS['zee5'])[0]
+    path = re.sub(r'\\(.)', r'\1', pattern)
+    return '/' + path if '/' in path else f'/{path}/license'
+
+class MockOttHandler(BaseHTTPRequestHandler):
+    server_version = 'MockOTT/1.0'
+    license_requests = 0
+    _lock = threading.Lock()
+
+    def log_message(self, format, *args):
+        pass  # Benchmarks shouldn't pay for access logging
+
+    def _send(self, status, body, content_type='text/html; charset=utf-8', headers=None):
+        body = body.encode() if isinstance(body, str) else body
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _is_license_path(self, path):
+        return any(path == license_path(service) for service in DRM_LICENSE_HOSTS)
+
+    def do_POST(self):
+        path = urlsplit(self.path).path
+        self.rfile.read(int(self.headers.get('Content-Length') or 0))
+        if self._is_license_path(path):
+            with self._lock:
+                MockOttHandler.license_requests += 1
+            self._send(200, b'\x08\x01license', 'application/octet-stream')
+        else:
+            self._send(404, 'not found', 'text/plain')
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        if url.path == '/poster.gif':
+            return self._send(200, _POSTER, 'image/gif')
+        parts = url.path.strip('/').split('/')
+        if len(parts) != 2:
+            return self._send(404, 'not found', 'text/plain')
+        service, page = parts
+        if page == 'player':
+            self._send(200, _PLAYER_PAGE.format(service=service, license_path=license_path(service)))
+        elif page == 'geo':
+            self._send(200, _GEO_PAGE.format(service=service))
+        elif page == 'slow':
+            delay = float(parse_qs(url.query).get('delay', ['5'])[0])
+            time.sleep(delay)
+            self._send(200, _PLAYER_PAGE.format(service=service, license_path=license_path(service)))
+        elif page == 'error':
+            self._send(302, '', headers={'Location': f'/{service}/error-page'})
+        elif page == 'error-page':
+            self._send(500, _ERROR_PAGE.format(service=service))
+        else:
+            self._send(404, 'not found', 'text/plain')
+
+class MockOttServer:
+    """Runs the mock sites on a background thread. Port 0 picks a free port."""
+
+    def __init__(self, host='127.0.0.1', port=0):
+        self.httpd = ThreadingHTTPServer((host, port), MockOttHandler)
+        self.httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self.httpd.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def url(self, service, scenario='player', **query):
+        url = f'{self.base_url}/{service}/{scenario}'
+        if query:
+            url += '?' + '&'.join(f'{key}={value}' for key, value in query.items())
+        return url
+
+    def service_config(self, service, scenario='player', **query):
+        """Browser-mode service config pointing at a mock page."""
+        return {'mode': 'browser', 'url': self.url(service, scenario, **query)}
+
+    def start(self):
+        self._thread = threading.Thread(target=self.httpd.serve_forever, name='mock-ott', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+def main():
+    parser = argparse.ArgumentParser(description='Serve mock OTT pages for offline testing.')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    args = parser.parse_args()
+    server = MockOttServer(args.host, args.port)
+    print(f"Mock OTT sites on {server.base_url}/<{'|'.join(DRM_LICENSE_HOSTS)}>/<{'|'.join(SCENARIOS)}>")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == '__main__':
+    main()
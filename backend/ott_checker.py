@@ -1,25 +1,173 @@
 import logging
 from datetime import datetime
 from pathlib import Path
-from playwright.sync_api import sync_playwright, expect
 import re
-from appium import webdriver
-from appium.webdriver.common.appiumby import AppiumBy
 import time
-from appium.options.android import UiAutomator2Options
-import subprocess
+import requests
+from functools import lru_cache
+from types import SimpleNamespace
+
+# Local Modules
+import android_capture
+import check_watchdog
+import logcat_tap
+import metrics
+import recordings
+import resource_governor
+from tracing import CheckTrace
 
 # You can set these from the main script
 logger = logging.getLogger('SmartBot')
 screenshots_dir = Path('screenshots')
 
+# License hosts per service. Each service only intercepts its own hosts.
+DRM_LICENSE_HOSTS = {
+    'hotstar': [r'licenser\.vmp\.cdn\.prod\.dtci\.technology'],
+    'sonyliv': [r'edge\.media\.sonyliv\.com/license/widevine'],
+    'zee5': [r'widevine-proxy\.zee5\.com', r'playready-proxy\.zee5\.com'],
+}
+
 DRM_LICENSE_URL_PATTERNS = [
-    re.compile(r'licenser\.vmp\.cdn\.prod\.dtci\.technology'),  # Hotstar
-    re.compile(r'edge\.media\.sonyliv\.com/license/widevine'), # SonyLIV
-    re.compile(r'widevine-proxy\.zee5\.com'),                 # Zee5
-    re.compile(r'playready-proxy\.zee5\.com'),                # Zee5
+    re.compile(pattern) for patterns in DRM_LICENSE_HOSTS.values() for pattern in patterns
 ]
 
+@lru_cache(maxsize=None)
+def _compile_license_matcher(patterns):
+    """Combine several license URL patterns into one regex."""
+    return re.compile('|'.join(f'(?:{p})' for p in patterns))
+
+def get_drm_license_matcher(service_name, service_config=None):
+    """Returns the combined license URL matcher for a service (all hosts if unknown)."""
+    patterns = (service_config or {}).get('drm_license_patterns') or DRM_LICENSE_HOSTS.get(service_name.lower())
+    if not patterns:
+        patterns = [p for host_patterns in DRM_LICENSE_HOSTS.values() for p in host_patterns]
+    return _compile_license_matcher(tuple(patterns))
+
+# Page classification defaults. Services can override any of these under
+# "classification" in their config.json entry. Selectors are plain CSS.
+DEFAULT_CLASSIFICATION = {
+    'success_selectors': ['video', '[class*="player"]', '[class*="play"]', '[class*="watch"]'],
+    'geo_block_phrases': [
+        'not available in your region',
+        'geo-blocked',
+        'not available in your country',
+        'access denied',
+        'unavailable in your location',
+        'content not available',
+        'service unavailable',
+        'region restricted',
+    ],
+    'error_url_patterns': [r'error'],
+}
+
+# Evaluates every success selector and reads the visible text in one round trip.
+_CLASSIFY_PAGE_SCRIPT = """
+(selectors) => {
+    const isVisible = (el) => {
+        const rect = el.getBoundingClientRect();
+        const style = window.getComputedStyle(el);
+        return rect.width > 0 && rect.height > 0 && style.visibility !== 'hidden' && style.display !== 'none';
+    };
+    const matched = selectors.filter((selector) => {
+        try {
+            return Array.from(document.querySelectorAll(selector)).some(isVisible);
+        } catch (e) {
+            return false;
+        }
+    });
+    return {matched: matched, text: document.body ? document.body.innerText : ''};
+}
+"""
+
+_classification_rules = {}
+
+def compile_classification_rules(service_name, service_config):
+    """Compiles a service's classification rules into selectors plus two combined regexes."""
+    rules = dict(DEFAULT_CLASSIFICATION)
+    rules.update(service_config.get('classification', {}))
+    # Service phrases add to the defaults; dropping a default would turn those pages into passes
+    phrases = list(dict.fromkeys(DEFAULT_CLASSIFICATION['geo_block_phrases'] + list(rules['geo_block_phrases'])))
+    error_patterns = rules['error_url_patterns']
+    compiled = {
+        'success_selectors': list(rules['success_selectors']),
+        'geo_block_re': re.compile('|'.join(re.escape(p) for p in phrases), re.IGNORECASE) if phrases else None,
+        'error_url_re': re.compile('|'.join(f'(?:{p})' for p in error_patterns), re.IGNORECASE) if error_patterns else None,
+    }
+    _classification_rules[service_name] = compiled
+    return compiled
+
+def load_classification_rules(ott_services):
+    """Compiles the rules for every configured service. Called once at startup."""
+    for service_name, service_config in ott_services.items():
+        compile_classification_rules(service_name, service_config)
+
+def get_classification_rules(service_name, service_config):
+    rules = _classification_rules.get(service_name)
+    if rules is None:
+        rules = compile_classification_rules(service_name, service_config)
+    return rules
+
+def classify_page(page, rules):
+    """
+    Classifies a loaded page as ('pass' | 'geo_block' | 'error', detail) using a single in-page script call.
+    """
+    snapshot = page.evaluate(_CLASSIFY_PAGE_SCRIPT, rules['success_selectors'])
+    if snapshot['matched']:
+        return 'pass', snapshot['matched'][0]
+    if rules['geo_block_re']:
+        m = rules['geo_block_re'].search(snapshot['text'])
+        if m:
+            return 'geo_block', m.group(0)
+    if not page.url or (rules['error_url_re'] and rules['error_url_re'].search(page.url)):
+        return 'error', page.url
+    return 'pass', None
+
+# Checker backends are imported the first time a service needs them, so a browser-only node
+# never imports Appium and an Android-only node (without browser fallback) never imports Playwright.
+def _import_browser_backend():
+    from playwright.sync_api import sync_playwright, expect
+    return SimpleNamespace(sync_playwright=sync_playwright, expect=expect)
+
+def _import_android_backend():
+    from appium import webdriver
+    from appium.webdriver.common.appiumby import AppiumBy
+    from appium.options.android import UiAutomator2Options
+    return SimpleNamespace(webdriver=webdriver, AppiumBy=AppiumBy, UiAutomator2Options=UiAutomator2Options)
+
+CHECKER_BACKENDS = {
+    'browser': _import_browser_backend,
+    'android': _import_android_backend,
+}
+
+_loaded_backends = {}
+backend_import_ms = {}
+
+def get_backend(mode):
+    backend = _loaded_backends.get(mode)
+    if backend is None:
+        started = time.monotonic()
+        backend = CHECKER_BACKENDS[mode]()
+        backend_import_ms[mode] = round((time.monotonic() - started) * 1000, 1)
+        _loaded_backends[mode] = backend
+        logger.info(f"Loaded {mode} checker backend in {backend_import_ms[mode]} ms")
+    return backend
+
+def required_backends(ott_services):
+    """Backends the configured services need; Android services with a URL also need the browser fallback."""
+    modes = set()
+    for service_config in ott_services.values():
+        mode = service_config.get('mode', 'browser')
+        modes.add(mode)
+        if mode == 'android' and service_config.get('url'):
+            modes.add('browser')
+    return sorted(modes)
+
+def preload_backends(ott_services):
+    """Imports every backend the configuration needs up front. Returns {mode: import ms}."""
+    for mode in required_backends(ott_services):
+        get_backend(mode)
+    return dict(backend_import_ms)
+
 def _handle_cookie_banners(page):
     """General purpose cookie banner handler."""
     cookie_buttons = [
@@ -44,7 +192,7 @@ def _login_hotstar(page, credentials):
     try:
         # A more robust locator for the mobile/email field
         email_field = page.locator('input[aria-label="email or mobile number"]')
-        expect(email_field).to_be_visible(timeout=10000)
+        get_backend('browser').expect(email_field).to_be_visible(timeout=10000)
         email_field.fill(credentials['username'])
         # This part is unlikely to succeed due to OTP, but we try.
         # The main goal is to let the user log in once and save the session.
@@ -53,17 +201,42 @@ def _login_hotstar(page, credentials):
     except Exception as e:
         logger.warning(f"Could not automatically fill login form (this is expected if already logged in or page changed): {e}")
 
-def check_ott(service_name, service_config, screenshots_dir=screenshots_dir, logger=logger):
+def probe_ott(service_name, service_config, timeout=10):
+    """
+    Cheap confirmation probe for a recently validated service: a plain HTTP GET of its URL,
+    failing on error status, an error URL after redirects or a geo-block phrase in the body.
+    """
+    url = service_config.get('url')
+    if not url:
+        return True  # Nothing cheaper to ask; trust the cached result
+    rules = get_classification_rules(service_name, service_config)
+    try:
+        response = requests.get(url, timeout=timeout, headers={'User-Agent': 'Mozilla/5.0'})
+    except requests.RequestException as e:
+        logger.info(f"Confirmation probe failed for {service_name}: {e}")
+        return False
+    if response.status_code >= 400:
+        return False
+    if rules['error_url_re'] and rules['error_url_re'].search(response.url):
+        return False
+    if rules['geo_block_re'] and rules['geo_block_re'].search(response.text):
+        return False
+    return True
+
+def check_ott(service_name, service_config, screenshots_dir=screenshots_dir, logger=logger, trace=None, handle=None):
     """
     Checks an OTT service for video playback and DRM handshake using browser or Android automation.
+    Per-phase timings are returned under 'spans'. When run under a deadline, teardown callbacks
+    are registered on `handle` (see check_watchdog.run_with_deadline).
     """
+    trace = trace or CheckTrace()
     mode = service_config.get('mode', 'browser')
     
     # Try Android first if specified, fallback to browser if it fails
     if mode == 'android':
         try:
             logger.info(f"Attempting Android mode for {service_name}...")
-            result = check_ott_android(service_name, service_config, screenshots_dir, logger)
+            result = check_ott_android(service_name, service_config, screenshots_dir, logger, trace, handle)
             if result['success']:
                 return result
             else:
@@ -72,6 +245,8 @@ def check_ott(service_name, service_config, screenshots_dir=screenshots_dir, log
             logger.error(f"Android mode crashed for {service_name}: {e}, falling back to browser mode")
     
     # Browser mode (Playwright) - either as primary or fallback
+    if handle and handle.cancelled.is_set():
+        raise check_watchdog.CheckCancelled(f"Check for {service_name} was cancelled")
     url = service_config.get('url')
     if not url:
         logger.error(f"No URL configured for {service_name} browser mode")
@@ -80,107 +255,201 @@ def check_ott(service_name, service_config, screenshots_dir=screenshots_dir, log
             'drm_handshake_detected': False,
             'final_screenshot_path': None,
             'drm_screenshot_path': None,
-            'error': 'No URL configured'
+            'error': 'No URL configured',
+            'spans': trace.spans,
         }
     
     final_screenshot_path = screenshots_dir / f'shot_{service_name}_{datetime.now().strftime("%Y%m%d_%H%M%S")}_final.png'
     drm_screenshot_path = None
+    drm_event = None
     
     success = False
-    drm_handshake_detected = False
+    verdict = detail = None
+    resource_limit = None
+    crash = None
+    navigation_failed = False
+    recording_mode = recording_dir = None
+    replayed_statuses = None
 
     try:
-        with sync_playwright() as p:
-            browser = p.chromium.launch(headless=True, args=['--disable-blink-features=AutomationControlled'])
-            page = browser.new_page()
-
-            def handle_request(request):
-                nonlocal drm_handshake_detected, drm_screenshot_path
-                if any(pattern.search(request.url) for pattern in DRM_LICENSE_URL_PATTERNS):
-                    logger.info(f"DRM license request detected for {service_name}: {request.url}")
-                    drm_handshake_detected = True
-                    drm_screenshot_filename = f'shot_{service_name}_{datetime.now().strftime("%Y%m%d_%H%M%S")}_drm.png'
-                    drm_screenshot_path = screenshots_dir / drm_screenshot_filename
-                    page.screenshot(path=str(drm_screenshot_path))
-                    logger.info(f"DRM handshake screenshot saved to {drm_screenshot_path}")
-
-            page.on('request', handle_request)
-            page.goto(url, timeout=60000, wait_until='domcontentloaded')
-
-            _handle_cookie_banners(page)
-            
-            page.wait_for_timeout(10000)
-
-            # Try multiple ways to detect video content
-            success = False
-            video_detection_methods = [
-                ('video element', lambda: page.locator('video').is_visible()),
-                ('video player', lambda: page.locator('[class*="player"]').is_visible()),
-                ('play button', lambda: page.locator('[class*="play"]').is_visible()),
-                ('watch button', lambda: page.locator('[class*="watch"]').is_visible()),
-                ('content area', lambda: page.locator('[class*="content"]').is_visible()),
-            ]
-            
-            for method_name, detection_func in video_detection_methods:
+        recording_mode, recording_dir, har_path = recordings.prepare(service_name, service_config.get('recording'))
+        trace.phase('browser_launch')
+        if handle:
+            # The sync API can't be driven from another thread, so cancellation kills the processes instead
+            handle.on_cancel(check_watchdog.kill_browser_processes)
+        sync_playwright = get_backend('browser').sync_playwright
+        governor = resource_governor.get_governor()
+        with governor.page_slot(), sync_playwright() as p:
+            browser = p.chromium.launch(headless=True, args=governor.launch_args(['--disable-blink-features=AutomationControlled']))
+            metrics.open_browsers.inc()
+            watch = governor.watch()
+            context = None
+            try:
+                context_options = {}
+                if recording_mode == 'record':
+                    context_options['record_har_path'] = str(har_path)  # Written when the context closes
+                context = browser.new_context(**context_options)
+                if recording_mode == 'replay':
+                    # Everything is served from the recording; requests it doesn't contain fail instead of going online
+                    context.route_from_har(str(har_path), not_found='abort')
+                    replayed_statuses = recordings.har_statuses(har_path)
+                page = context.new_page()
+
+                license_matcher = get_drm_license_matcher(service_name, service_config)
+
+                def handle_license_route(route, request):
+                    # Only license requests reach this handler; everything else stays in the browser.
+                    nonlocal drm_event
+                    requested_at = datetime.now()
+                    started = time.monotonic()
+                    status = None
+                    try:
+                        if replayed_statuses is not None:
+                            # Page routes run first; fall back to the context's recording for the response
+                            status = replayed_statuses.get(request.url)
+                            route.fallback()
+                        else:
+                            response = route.fetch()
+                            status = response.status
+                            route.fulfill(response=response)
+                    except Exception as e:
+                        logger.warning(f"DRM license fetch failed for {service_name}, continuing request: {e}")
+                        try:
+                            route.continue_()
+                        except Exception:
+                            pass
+                    if drm_event is None:
+                        drm_event = {
+                            'url': request.url,
+                            'method': request.method,
+                            'status': status,
+                            'requested_at': requested_at.isoformat(timespec='milliseconds'),
+                            'latency_ms': round((time.monotonic() - started) * 1000, 1),
+                        }
+                        logger.info(f"DRM license request detected for {service_name}: {request.url} ({drm_event['latency_ms']} ms)")
+
+                def capture_drm_screenshot():
+                    # Taken once, outside the route handler, the first time we get back to the page after a license hit.
+                    nonlocal drm_screenshot_path
+                    if drm_event is None or drm_screenshot_path is not None:
+                        return
+                    drm_screenshot_path = screenshots_dir / f'shot_{service_name}_{datetime.now().strftime("%Y%m%d_%H%M%S")}_drm.png'
+                    try:
+                        page.screenshot(path=str(drm_screenshot_path))
+                        logger.info(f"DRM handshake screenshot saved to {drm_screenshot_path}")
+                    except Exception as e:
+                        logger.warning(f"DRM handshake screenshot failed for {service_name}: {e}")
+                        drm_screenshot_path = None
+
+                page.route(license_matcher, handle_license_route)
+                trace.phase('navigation')
                 try:
-                    if detection_func():
-                        success = True
-                        logger.info(f"{method_name} found for {service_name}.")
-                        break
+                    page.goto(url, timeout=60000, wait_until='domcontentloaded')
                 except Exception:
-                    continue
+                    # The site didn't load over this IP, which (unlike a crash) is blamed on the IP
+                    navigation_failed = True
+                    raise
+
+                trace.phase('cookie_banner')
+                _handle_cookie_banners(page)
             
-            if not success:
-                # Check if it's a geo-block page
+                trace.phase('readiness_wait')
+                page.wait_for_timeout(service_config.get('readiness_wait_ms', 10000))
+                capture_drm_screenshot()
+
+                trace.phase('detection')
                 try:
-                    geo_block_indicators = [
-                        'not available in your region',
-                        'geo-blocked',
-                        'not available in your country',
-                        'access denied',
-                        'unavailable in your location',
-                        'content not available',
-                        'service unavailable',
-                        'region restricted'
-                    ]
-                    page_text = page.content().lower()
-                    if any(indicator in page_text for indicator in geo_block_indicators):
-                        logger.warning(f"Geo-block detected for {service_name}.")
-                        success = False  # Explicitly mark as geo-blocked
-                    else:
-                        # Check if page loaded successfully (not a 404 or error)
-                        if page.url and 'error' not in page.url.lower():
-                            logger.info(f"Page loaded successfully for {service_name}, but no video content found (may need login or subscription)")
-                            success = True  # Mark as success if page loads (geo-block bypassed)
-                        else:
-                            logger.warning(f"No video content found for {service_name}.")
-                except Exception:
-                    logger.warning(f"Video element not found for {service_name}.")
+                    verdict, detail = classify_page(page, get_classification_rules(service_name, service_config))
+                except Exception as e:
+                    verdict, detail = 'error', str(e)
+                if verdict == 'pass' and detail:
+                    logger.info(f"{detail} found for {service_name}.")
+                elif verdict == 'pass':
+                    # Page loaded without a geo-block message (geo-block bypassed)
+                    logger.info(f"Page loaded successfully for {service_name}, but no video content found (may need login or subscription)")
+                elif verdict == 'geo_block':
+                    logger.warning(f"Geo-block detected for {service_name}: '{detail}'.")
+                else:
+                    logger.warning(f"No video content found for {service_name} ({detail}).")
+                success = verdict == 'pass'
 
-            page.screenshot(path=str(final_screenshot_path))
-            browser.close()
-        logger.info(f"OTT check for {service_name}: {'PASS' if success else 'FAIL'} | DRM detected: {drm_handshake_detected} | Screenshot: {final_screenshot_path}")
+                trace.phase('screenshot')
+                capture_drm_screenshot()
+                page.screenshot(path=str(final_screenshot_path))
+                trace.phase('teardown')
+            finally:
+                # Runs when the check raises too, so no Chromium outlives its check
+                watch.stop()
+                resource_limit = watch.exceeded
+                try:
+                    if context:
+                        context.close()
+                    browser.close()
+                except Exception as e:
+                    logger.warning(f"Browser close failed for {service_name}: {e}")
+                metrics.open_browsers.dec()
+        trace.end()
+        logger.info(f"OTT check for {service_name}: {'PASS' if success else 'FAIL'} | DRM detected: {drm_event is not None} | Screenshot: {final_screenshot_path}")
+        if recording_mode == 'record':
+            recordings.save_result(recording_dir, service_name, url, {
+                'success': success,
+                'classification': verdict,
+                'detail': detail,
+                'drm_handshake_detected': drm_event is not None,
+                'drm_event': drm_event,
+            })
+            logger.info(f"Recorded {service_name} check to {recording_dir}")
 
     except Exception as e:
+        trace.end()
+        if isinstance(e, resource_governor.ResourceLimitError):
+            resource_limit = e.limit
+        elif not navigation_failed:
+            # Browser launch failures and the like: infrastructure, so backoff rather than rotation
+            crash = f'{type(e).__name__}: {e}'
         logger.error(f"OTT check failed for {service_name}: {e}", exc_info=True)
 
-    return {
+    result = {
         'success': success,
-        'drm_handshake_detected': drm_handshake_detected,
+        'drm_handshake_detected': drm_event is not None,
+        'drm_event': drm_event,
+        'classification': verdict,
+        'classification_detail': detail,
         'final_screenshot_path': str(final_screenshot_path),
         'drm_screenshot_path': str(drm_screenshot_path) if drm_screenshot_path else None,
+        'recording': str(recording_dir) if recording_dir else None,
+        'spans': trace.spans,
     }
+    if resource_limit:
+        # Says nothing about the IP (see scheduler.is_ip_related_failure)
+        result.update(success=False, resource_limit=resource_limit, error=f'Browser hit its {resource_limit} limit')
+    elif crash:
+        result.update(success=False, error=crash)
+    return result
 
-def check_ott_android(service_name, service_config, screenshots_dir=screenshots_dir, logger=logger):
+def check_ott_android(service_name, service_config, screenshots_dir=screenshots_dir, logger=logger, trace=None, handle=None):
     """
     Android OTT check using Appium. Launches the app, attempts to play content, takes a screenshot, and checks for playback UI.
     """
     logger.info(f"[Android] Checking OTT for {service_name} on device {service_config.get('device_udid')}")
     final_screenshot_path = screenshots_dir / f'shot_{service_name}_{datetime.now().strftime("%Y%m%d_%H%M%S")}_android_final.png'
     success = False
-    drm_handshake_detected = False
+    drm_event = None
     driver = None
+    tap = None
+    check_started = time.time()
+    trace = trace or CheckTrace()
+    backend = get_backend('android')
+    AppiumBy = backend.AppiumBy
+    # Waits end early once the watchdog cancels the check
+    sleep = handle.sleep if handle else time.sleep
     try:
+        trace.phase('android_session')
+        # Start (or reuse) the logcat tap before launching the app so the license exchange isn't missed
+        try:
+            tap = logcat_tap.get_tap(service_config.get('device_udid'))
+        except Exception as e:
+            logger.warning(f"[Android] Logcat tap unavailable for {service_name}: {e}")
         desired_caps = {
             'platformName': 'Android',
             'deviceName': service_config.get('device_udid'),
@@ -192,11 +461,17 @@ def check_ott_android(service_name, service_config, screenshots_dir=screenshots_
             'newCommandTimeout': 120,
             'forceAppLaunch': True,  # Ensure app is brought to foreground
         }
-        options = UiAutomator2Options().load_capabilities(desired_caps)
-        driver = webdriver.Remote(service_config.get('appium_server_url'), options=options)
+        options = backend.UiAutomator2Options().load_capabilities(desired_caps)
+        driver = backend.webdriver.Remote(service_config.get('appium_server_url'), options=options)
+        if handle:
+            handle.on_cancel(driver.quit)
+            # The deadline may have passed while the session was starting; the finally quits the driver
+            if handle.cancelled.is_set():
+                raise check_watchdog.CheckCancelled(f"Check for {service_name} was cancelled")
+        trace.phase('android_app_launch')
         logger.info(f"[Android] App launched for {service_name}")
-        time.sleep(8)  # Wait for app to load
-        time.sleep(10)  # Additional wait for UI to load fully
+        sleep(8)  # Wait for app to load
+        sleep(10)  # Additional wait for UI to load fully
 
         # After launching the app, verify the correct app is in the foreground
         expected_package = service_config.get('appPackage')
@@ -208,20 +483,21 @@ def check_ott_android(service_name, service_config, screenshots_dir=screenshots_
         if current_package != expected_package:
             logger.error(f"[Android] Expected app {expected_package} but found {current_package} in foreground!")
             try:
-                driver.save_screenshot(str(final_screenshot_path))
+                android_capture.save_screenshot(service_config, final_screenshot_path, driver)
                 logger.info(f"[Android] Screenshot saved (wrong app): {final_screenshot_path}")
             except Exception as e:
                 logger.warning(f"[Android] Screenshot failed for wrong app: {e}")
-            if driver:
-                driver.quit()
+            # Driver teardown happens in the finally block below
             return {
                 'success': False,
                 'error': f'App {expected_package} not in foreground, found {current_package}',
                 'final_screenshot_path': str(final_screenshot_path),
                 'drm_screenshot_path': None,
+                'spans': trace.spans,
             }
 
         # Dismiss common popups if present
+        trace.phase('android_popups')
         popup_texts = ["Close", "Skip", "Not Now", "Dismiss", "Cancel"]
         for popup_text in popup_texts:
             try:
@@ -229,11 +505,12 @@ def check_ott_android(service_name, service_config, screenshots_dir=screenshots_
                 if popup_btn.is_displayed():
                     popup_btn.click()
                     logger.info(f"[Android] Dismissed popup: {popup_text}")
-                    time.sleep(2)
+                    sleep(2)
             except Exception:
                 continue
 
         # Try to click the first clickable element (likely a video thumbnail)
+        trace.phase('android_play')
         try:
             clickable_elements = driver.find_elements(AppiumBy.ANDROID_UIAUTOMATOR, 'new UiSelector().clickable(true)')
             for el in clickable_elements:
@@ -249,7 +526,7 @@ def check_ott_android(service_name, service_config, screenshots_dir=screenshots_
                             try:
                                 el.click()
                                 logger.info(f"[Android] Clicked a clickable element (likely video thumbnail) with bounds {bounds}")
-                                time.sleep(5)
+                                sleep(5)
                                 break
                             except Exception as e:
                                 logger.warning(f"[Android] Failed to click clickable element: {e}")
@@ -259,7 +536,7 @@ def check_ott_android(service_name, service_config, screenshots_dir=screenshots_
         # For Zee5 and Hotstar, take screenshot before clicking Play to avoid FLAG_SECURE error
         if service_name.lower() in ["zee5", "hotstar"]:
             try:
-                driver.save_screenshot(str(final_screenshot_path))
+                android_capture.save_screenshot(service_config, final_screenshot_path, driver)
                 logger.info(f"[Android] Screenshot saved (before Play): {final_screenshot_path}")
             except Exception as e:
                 logger.warning(f"[Android] Screenshot failed for {service_name} (before Play): {e}")
@@ -287,7 +564,7 @@ def check_ott_android(service_name, service_config, screenshots_dir=screenshots_
                         el.click()
                         logger.info(f"[Android] Clicked Hotstar button using: {by} = {selector}")
                         play_clicked = True
-                        time.sleep(5)
+                        sleep(5)
                         break
                 except Exception:
                     continue
@@ -303,7 +580,7 @@ def check_ott_android(service_name, service_config, screenshots_dir=screenshots_
                     el.click()
                     logger.info(f"[Android] Clicked Play Now button for SonyLIV")
                     play_clicked = True
-                    time.sleep(5)
+                    sleep(5)
             except Exception:
                 try:
                     el = driver.find_element(AppiumBy.ID, "com.sonyliv:id/spotlight_button_text")
@@ -311,7 +588,7 @@ def check_ott_android(service_name, service_config, screenshots_dir=screenshots_
                         el.click()
                         logger.info(f"[Android] Clicked Play Now (ID) for SonyLIV")
                         play_clicked = True
-                        time.sleep(5)
+                        sleep(5)
                 except Exception as e:
                     logger.warning(f"[Android] Play button not found for SonyLIV: {e}")
         elif service_name.lower() == "zee5":
@@ -321,7 +598,7 @@ def check_ott_android(service_name, service_config, screenshots_dir=screenshots_
                     el.click()
                     logger.info(f"[Android] Clicked Play Button for Zee5")
                     play_clicked = True
-                    time.sleep(5)
+                    sleep(5)
             except Exception:
                 try:
                     el = driver.find_element(AppiumBy.ID, "com.graymatrix.did:id/playIcon")
@@ -329,7 +606,7 @@ def check_ott_android(service_name, service_config, screenshots_dir=screenshots_
                         el.click()
                         logger.info(f"[Android] Clicked Play Icon (ID) for Zee5")
                         play_clicked = True
-                        time.sleep(5)
+                        sleep(5)
                 except Exception as e:
                     logger.warning(f"[Android] Play button not found for Zee5: {e}")
         else:
@@ -346,28 +623,30 @@ def check_ott_android(service_name, service_config, screenshots_dir=screenshots_
                         el.click()
                         logger.info(f"[Android] Clicked Play/Watch button for {service_name}")
                         play_clicked = True
-                        time.sleep(5)
+                        sleep(5)
                         break
                 except Exception:
                     continue
         if not play_clicked:
             logger.warning(f"[Android] Play button not found for {service_name}")
             try:
-                driver.save_screenshot(str(final_screenshot_path))
+                android_capture.save_screenshot(service_config, final_screenshot_path, driver)
                 logger.info(f"[Android] Screenshot saved (partial success): {final_screenshot_path}")
                 success = True  # Mark as partial success if app is open
             except Exception as e:
                 logger.warning(f"[Android] Screenshot failed for {service_name}: {e}")
 
         # Take screenshot for non-Zee5 apps after Play
+        trace.phase('android_screenshot')
         if service_name.lower() != "zee5":
             try:
-                driver.save_screenshot(str(final_screenshot_path))
+                android_capture.save_screenshot(service_config, final_screenshot_path, driver)
                 logger.info(f"[Android] Screenshot saved: {final_screenshot_path}")
             except Exception as e:
                 logger.warning(f"[Android] Screenshot failed for {service_name}: {e}")
 
         # Check for playback UI (e.g., pause button, progress bar, etc.)
+        trace.phase('android_detection')
         playback_indicators = [
             (AppiumBy.ANDROID_UIAUTOMATOR, 'new UiSelector().descriptionContains("Pause")'),
             (AppiumBy.ANDROID_UIAUTOMATOR, 'new UiSelector().descriptionContains("progress")'),
@@ -382,8 +661,11 @@ def check_ott_android(service_name, service_config, screenshots_dir=screenshots_
                     break
             except Exception:
                 continue
-        # DRM handshake detection: Not trivial on Android, so set to False or implement with logcat parsing if needed
-        drm_handshake_detected = False
+        # DRM handshake detection: look for a license exchange in the device's DRM log during this check
+        if tap:
+            drm_event = tap.find_license_exchange(check_started)
+            if drm_event:
+                logger.info(f"[Android] DRM license exchange detected for {service_name}: {drm_event['tag']}: {drm_event['message']}")
 
         # Only set success = True if play_clicked and correct app is in foreground
         if play_clicked:
@@ -392,26 +674,23 @@ def check_ott_android(service_name, service_config, screenshots_dir=screenshots_
         logger.error(f"[Android] OTT check failed for {service_name}: {e}", exc_info=True)
         # Always try to save a screenshot, even if driver is not available
         try:
-            if driver:
-                driver.save_screenshot(str(final_screenshot_path))
+            # Streams straight from the device, so this works even if the driver never came up
+            if android_capture.save_screenshot(service_config, final_screenshot_path, driver):
                 logger.info(f"[Android] Screenshot saved (exception): {final_screenshot_path}")
             else:
-                # Fallback: use adb to capture the screen if driver is not available
-                subprocess.run([
-                    "adb", "-s", service_config.get('device_udid'), "shell", "screencap", "-p", "/sdcard/ottbot_tmp.png"
-                ], check=True)
-                subprocess.run([
-                    "adb", "-s", service_config.get('device_udid'), "pull", "/sdcard/ottbot_tmp.png", str(final_screenshot_path)
-                ], check=True)
-                logger.info(f"[Android] Screenshot saved via adb (exception): {final_screenshot_path}")
+                logger.warning(f"[Android] Could not capture device screen for {service_name}")
         except Exception as se:
             logger.warning(f"[Android] Could not save screenshot on exception: {se}")
     finally:
+        trace.phase('android_teardown')
         if driver:
             driver.quit()
+        trace.end()
     return {
         'success': success,
-        'drm_handshake_detected': drm_handshake_detected,
+        'drm_handshake_detected': drm_event is not None,
+        'drm_event': drm_event,
         'final_screenshot_path': str(final_screenshot_path),
         'drm_screenshot_path': None,
+        'spans': trace.spans,
     }
@@ -0,0 +1,61 @@
+import os
+
+# Process and memory stats read straight from /proc (Linux only)
+
+def process_table():
+    """Returns {pid: (ppid, cmdline)} for every process we can read in /proc."""
+    table = {}
+    for entry in os.listdir('/proc'):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f'/proc/{entry}/stat') as f:
+                stat = f.read()
+            with open(f'/proc/{entry}/cmdline', 'rb') as f:
+                cmdline = f.read().replace(b'\0', b' ').decode(errors='replace')
+        except OSError:
+            continue
+        # The command name in stat can contain spaces, so split after the closing paren
+        ppid = int(stat.rsplit(')', 1)[1].split()[1])
+        table[int(entry)] = (ppid, cmdline)
+    return table
+
+def find_descendants(root_pid=None, patterns=()):
+    """PIDs of descendants of root_pid (default: this process) whose command line matches any pattern."""
+    root_pid = root_pid or os.getpid()
+    table = process_table()
+    children = {}
+    for pid, (ppid, _) in table.items():
+        children.setdefault(ppid, []).append(pid)
+    found = []
+    stack = list(children.get(root_pid, []))
+    while stack:
+        pid = stack.pop()
+        stack.extend(children.get(pid, []))
+        if not patterns or any(p in table[pid][1] for p in patterns):
+            found.append(pid)
+    return found
+
+def process_rss_bytes(pid='self'):
+    """Resident memory of a process, 0 if it is gone."""
+    try:
+        with open(f'/proc/{pid}/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, IndexError, ValueError):
+        return 0
+
+def process_cpu_seconds(pid='self'):
+    """User plus system CPU time of a process, 0 if it is gone."""
+    try:
+        with open(f'/proc/{pid}/stat') as f:
+            fields = f.read().rsplit(')', 1)[1].split()
+        return (int(fields[11]) + int(fields[12])) / os.sysconf('SC_CLK_TCK')
+    except (OSError, IndexError, ValueError):
+        return 0.0
+
+def available_memory_bytes():
+    with open('/proc/meminfo') as f:
+        for line in f:
+            if line.startswith('MemAvailable:'):
+                return int(line.split()[1]) * 1024
+    return 0
@@ -0,0 +1,112 @@
+import logging
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from datetime import datetime
+from pathlib import Path
+
+logger = logging.getLogger('SmartBot')
+
+MAX_PROFILE_SECONDS = 300
+
+class SamplingProfiler:
+    """
+    Wall-clock sampling profiler for the running process. A background thread reads
+    every thread's current stack at a fixed interval and aggregates them as folded
+    stacks (one "thread;frame;frame count" line each), the input format of
+    flamegraph.pl / speedscope. Nothing is installed or running until start() is called.
+    """
+
+    def __init__(self, output_dir, interval=0.01):
+        self.output_dir = Path(output_dir)
+        self.interval = interval
+        self._thread = None
+        self._stop = threading.Event()
+        self._stacks = Counter()
+        self._started_at = None
+        self._samples = 0
+        self.last_output = None
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, seconds=60):
+        if self.running:
+            raise RuntimeError('Profiler is already running')
+        seconds = max(1, min(int(seconds), MAX_PROFILE_SECONDS))
+        self._stacks = Counter()
+        self._samples = 0
+        self._stop.clear()
+        self._started_at = datetime.now()
+        self._thread = threading.Thread(target=self._run, args=(seconds,), name='profiler', daemon=True)
+        self._thread.start()
+        logger.info(f"Sampling profiler started for up to {seconds}s")
+        return seconds
+
+    def stop(self):
+        if not self.running:
+            return self.last_output
+        self._stop.set()
+        self._thread.join()
+        return self.last_output
+
+    def _run(self, seconds):
+        own_id = threading.get_ident()
+        deadline = time.monotonic() + seconds
+        while not self._stop.is_set() and time.monotonic() < deadline:
+            names = {t.ident: t.name for t in threading.enumerate()}
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f'{code.co_name} ({Path(code.co_filename).name}:{frame.f_lineno})')
+                    frame = frame.f_back
+                stack.append(names.get(thread_id, str(thread_id)))
+                self._stacks[';'.join(reversed(stack))] += 1
+            self._samples += 1
+            time.sleep(self.interval)
+        self.last_output = self._write()
+
+    def _write(self):
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        path = self.output_dir / f'profile_{self._started_at.strftime("%Y%m%d_%H%M%S")}.folded'
+        with open(path, 'w') as f:
+            for stack, count in self._stacks.most_common():
+                f.write(f'{stack} {count}\n')
+        logger.info(f"Sampling profiler stopped after {self._samples} samples, written to {path}")
+        return path
+
+def tracemalloc_start(frames=25):
+    if not tracemalloc.is_tracing():
+        tracemalloc.start(frames)
+        logger.info("tracemalloc started")
+
+def tracemalloc_stop():
+    if tracemalloc.is_tracing():
+        tracemalloc.stop()
+        logger.info("tracemalloc stopped")
+
+def tracemalloc_snapshot(output_dir, top=50):
+    """
+    Dumps a tracemalloc snapshot (loadable with tracemalloc.Snapshot.load) plus a
+    text summary of the top allocation sites. Returns both paths.
+    """
+    if not tracemalloc.is_tracing():
+        raise RuntimeError('tracemalloc is not running')
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    stamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    snapshot = tracemalloc.take_snapshot()
+    dump_path = output_dir / f'tracemalloc_{stamp}.snapshot'
+    summary_path = output_dir / f'tracemalloc_{stamp}.txt'
+    snapshot.dump(str(dump_path))
+    with open(summary_path, 'w') as f:
+        for stat in snapshot.statistics('lineno')[:top]:
+            f.write(f'{stat}\n')
+    logger.info(f"tracemalloc snapshot written to {dump_path}")
+    return dump_path, summary_path
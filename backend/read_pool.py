@@ -0,0 +1,53 @@
+import os
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+class ReadPool:
+    """
+    Bounded pool of real OS threads for the API's blocking work (SQLite reads, directory
+    scans), so request handlers never block the server. Each pool thread keeps its own
+    read-only SQLite connection instead of sharing the bot's writer connection.
+
+    In gevent/eventlet modes the calling greenlet yields while the work runs on the
+    hub's native thread pool.
+    """
+
+    def __init__(self, db_path, size=4, async_mode='threading'):
+        self.db_path = Path(db_path).resolve()
+        self._local = threading.local()
+        if async_mode == 'gevent':
+            from gevent.threadpool import ThreadPool
+            pool = ThreadPool(size)
+            self._call = lambda fn, *args: pool.apply(fn, args)
+        elif async_mode == 'eventlet':
+            from eventlet import tpool
+            tpool.set_num_threads(size)
+            self._call = tpool.execute
+        else:
+            pool = ThreadPoolExecutor(max_workers=size, thread_name_prefix='api-read')
+            self._call = lambda fn, *args: pool.submit(fn, *args).result()
+
+    def _connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(f'file:{self.db_path}?mode=ro', uri=True, check_same_thread=False)
+            self._local.conn = conn
+        return conn
+
+    def query(self, fn, *args):
+        """Runs fn(conn, *args) on a pool thread with that thread's read-only connection."""
+        return self._call(lambda: fn(self._connection(), *args))
+
+    def run(self, fn, *args):
+        return self._call(fn, *args)
+
+def list_files(directory, suffix=''):
+    """File names in a directory, newest first, using one scandir pass."""
+    try:
+        with os.scandir(directory) as entries:
+            files = [(e.stat().st_mtime, e.name) for e in entries if e.is_file() and e.name.endswith(suffix)]
+    except FileNotFoundError:
+        return []
+    return [name for _, name in sorted(files, reverse=True)]
@@ -0,0 +1,50 @@
+import json
+import zipfile
+from datetime import datetime
+from pathlib import Path
+
+# Recorded browser checks. Each recording is a directory holding the check's network traffic
+# (traffic.har.zip, written by Playwright) and the result it produced (result.json):
+#   <dir>/<service>/<YYYYmmdd_HHMMSS>/
+# A service opts in with "recording": {"mode": "record", "dir": "recordings"} in its config,
+# or {"mode": "replay", "path": "<recording dir>"} to serve a recording back offline.
+
+HAR_NAME = 'traffic.har.zip'
+RESULT_NAME = 'result.json'
+RESULT_FIELDS = ('success', 'classification', 'detail', 'drm_handshake_detected', 'drm_event')
+
+def prepare(service_name, recording):
+    """Returns (mode, directory, har_path) for a check, or (None, None, None) when not recording."""
+    mode = (recording or {}).get('mode')
+    if mode == 'record':
+        directory = Path(recording.get('dir', 'recordings')) / service_name / datetime.now().strftime('%Y%m%d_%H%M%S')
+        directory.mkdir(parents=True, exist_ok=True)
+    elif mode == 'replay':
+        directory = Path(recording['path'])
+        if not (directory / HAR_NAME).exists():
+            raise FileNotFoundError(f"No recording at {directory / HAR_NAME}")
+    elif mode:
+        raise ValueError(f"Unknown recording mode '{mode}', expected 'record' or 'replay'")
+    else:
+        return None, None, None
+    return mode, directory, directory / HAR_NAME
+
+def har_statuses(har_path):
+    """{url: status} of every response in a recording, for replaying license exchanges."""
+    with zipfile.ZipFile(har_path) as archive:
+        name = next(n for n in archive.namelist() if n.endswith('.har'))
+        har = json.loads(archive.read(name))
+    return {entry['request']['url']: entry['response']['status'] for entry in har['log']['entries']}
+
+def save_result(directory, service_name, url, result):
+    data = {field: result.get(field) for field in RESULT_FIELDS}
+    data.update(service=service_name, url=url, recorded_at=datetime.now().isoformat(timespec='seconds'))
+    (directory / RESULT_NAME).write_text(json.dumps(data, indent=2))
+
+def load_result(directory):
+    return json.loads((Path(directory) / RESULT_NAME).read_text())
+
+def find(root, service_name=None):
+    """Complete recordings under root (optionally for one service), oldest first."""
+    pattern = f'{service_name or "*"}/*/{RESULT_NAME}'
+    return sorted(path.parent for path in Path(root).glob(pattern) if (path.parent / HAR_NAME).exists())
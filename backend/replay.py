@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Replays recorded browser checks offline (see recordings.py) and compares the outcome with
+what was recorded, so detection rules, DRM interception and readiness waits can be tuned
+and benchmarked without touching the live sites or the SIM.
+
+  python3 replay.py                                # every recording under ./recordings
+  python3 replay.py --service zee5 --repeat 5      # one service, timed over 5 runs
+  python3 replay.py --readiness-wait-ms 10000      # same wait as a live check
+
+Classification rules come from the service's entry in --config, so edited rules are
+tested against the recorded pages. Exits non-zero when any replay disagrees with its recording.
+"""
+
+import argparse
+import json
+import sys
+import tempfile
+from pathlib import Path
+
+import recordings
+from benchmark import percentile
+from ott_checker import check_ott, load_classification_rules
+
+COMPARED_FIELDS = ('classification', 'drm_handshake_detected')
+
+def replay_config(recording_dir, recorded, service_config, readiness_wait_ms):
+    config = {key: service_config[key] for key in ('classification', 'drm_license_patterns') if key in service_config}
+    config.update(
+        mode='browser',
+        url=recorded['url'],
+        recording={'mode': 'replay', 'path': str(recording_dir)},
+        readiness_wait_ms=readiness_wait_ms,
+    )
+    return config
+
+def main():
+    parser = argparse.ArgumentParser(description='Replay recorded OTT checks offline.')
+    parser.add_argument('--dir', default='recordings')
+    parser.add_argument('--service')
+    parser.add_argument('--config', default='config.json')
+    parser.add_argument('--repeat', type=int, default=1)
+    parser.add_argument('--readiness-wait-ms', type=int, default=2000)
+    args = parser.parse_args()
+
+    config_path = Path(args.config)
+    ott_services = json.loads(config_path.read_text()).get('ott_services', {}) if config_path.exists() else {}
+    screenshots_dir = Path(tempfile.mkdtemp(prefix='smartbot-replay-'))
+    found = recordings.find(args.dir, args.service)
+    if not found:
+        print(f"No recordings found under {args.dir}")
+        sys.exit(1)
+
+    mismatches = 0
+    durations = []
+    phases = {}
+    for recording_dir in found:
+        recorded = recordings.load_result(recording_dir)
+        service = recorded['service']
+        service_config = replay_config(recording_dir, recorded, ott_services.get(service, {}), args.readiness_wait_ms)
+        load_classification_rules({service: service_config})
+        for _ in range(args.repeat):
+            result = check_ott(service, service_config, screenshots_dir)
+            spans = result.get('spans', [])
+            durations.append(sum(span['duration_ms'] for span in spans))
+            for span in spans:
+                phases.setdefault(span['phase'], []).append(span['duration_ms'])
+            expected = tuple(recorded.get(field) for field in COMPARED_FIELDS)
+            got = tuple(result.get(field) for field in COMPARED_FIELDS)
+            if got != expected:
+                mismatches += 1
+                print(f"MISMATCH {recording_dir}: recorded {expected}, replayed {got}")
+
+    print(f"Replayed {len(found)} recordings x {args.repeat}: {mismatches} mismatches")
+    print(f"  check      p50 {percentile(durations, 50)} ms   p95 {percentile(durations, 95)} ms")
+    for phase, values in phases.items():
+        print(f"  {phase:10} p50 {percentile(values, 50)} ms   p95 {percentile(values, 95)} ms")
+    sys.exit(1 if mismatches else 0)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,195 @@
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+import check_watchdog
+import metrics
+import procfs
+
+logger = logging.getLogger('SmartBot')
+
+# Processes that belong to browser automation: the Playwright driver, Playwright's Chromium
+# builds and chromedriver. Orphans of these are reaped; other Chrome instances are left alone.
+ORPHAN_PATTERNS = ('ms-playwright', 'playwright/driver', 'chromedriver', 'headless_shell')
+
+class ResourceLimitError(RuntimeError):
+    def __init__(self, limit, message):
+        super().__init__(message)
+        self.limit = limit
+
+class _BrowserWatch:
+    """Samples this process's browser processes during a check and kills them past the limits."""
+
+    def __init__(self, governor):
+        self.governor = governor
+        self.exceeded = None
+        self.peak_rss = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='browser-watch', daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        governor = self.governor
+        while not self._stop.wait(governor.sample_seconds):
+            pids = procfs.find_descendants(patterns=check_watchdog.BROWSER_PROCESS_PATTERNS)
+            rss = sum(procfs.process_rss_bytes(pid) for pid in pids)
+            cpu = sum(procfs.process_cpu_seconds(pid) for pid in pids)
+            self.peak_rss = max(self.peak_rss, rss)
+            if governor.context_memory_mb and rss > governor.context_memory_mb * 2 ** 20:
+                self.exceeded = 'memory'
+            elif governor.context_cpu_seconds and cpu > governor.context_cpu_seconds:
+                self.exceeded = 'cpu'
+            if self.exceeded:
+                governor.record_limit_kill(self.exceeded)
+                logger.warning(f"Browser exceeded its {self.exceeded} limit ({rss / 2 ** 20:.0f} MB, {cpu:.0f}s CPU); killing it.")
+                check_watchdog.kill_browser_processes()
+                return
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+class ResourceGovernor:
+    """
+    Keeps browser checks inside the machine's memory: pages are only opened while
+    MemAvailable leaves room for another page on top of `reserve_memory_mb`, each browser
+    is capped in memory and CPU for the duration of a check, and leftover automation
+    processes are reaped and accounted for.
+    """
+
+    def __init__(self, page_memory_mb=350, reserve_memory_mb=256, max_pages=2, context_memory_mb=900,
+                 context_cpu_seconds=180, js_heap_mb=512, wait_for_memory_seconds=60, sample_seconds=1.0):
+        self.page_memory_mb = page_memory_mb
+        self.reserve_memory_mb = reserve_memory_mb
+        self.max_pages = max_pages
+        self.context_memory_mb = context_memory_mb
+        self.context_cpu_seconds = context_cpu_seconds
+        self.js_heap_mb = js_heap_mb
+        self.wait_for_memory_seconds = wait_for_memory_seconds
+        self.sample_seconds = sample_seconds
+        self.active_pages = 0
+        self.reclaimed = {'processes': 0, 'rss_mb': 0.0}
+        self.limit_kills = {}
+        self.last_reap = None
+        self._cond = threading.Condition()
+
+    @classmethod
+    def from_config(cls, config):
+        limits = config.get('browser_limits', {})
+        return cls(
+            page_memory_mb=limits.get('page_memory_mb', 350),
+            reserve_memory_mb=limits.get('reserve_memory_mb', 256),
+            max_pages=limits.get('max_pages', 2),
+            context_memory_mb=limits.get('context_memory_mb', 900),
+            context_cpu_seconds=limits.get('context_cpu_seconds', 180),
+            js_heap_mb=limits.get('js_heap_mb', 512),
+            wait_for_memory_seconds=limits.get('wait_for_memory_seconds', 60),
+        )
+
+    def allowed_pages(self):
+        spare = procfs.available_memory_bytes() - self.reserve_memory_mb * 2 ** 20
+        return min(self.max_pages, self.active_pages + max(0, int(spare // (self.page_memory_mb * 2 ** 20))))
+
+    @contextmanager
+    def page_slot(self):
+        """Holds one page slot for a check, waiting up to wait_for_memory_seconds for memory to free up."""
+        deadline = time.monotonic() + self.wait_for_memory_seconds
+        with self._cond:
+            while self.active_pages >= self.allowed_pages():
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise ResourceLimitError('memory', f"Not enough memory for another browser page ({procfs.available_memory_bytes() // 2 ** 20} MB available)")
+                self._cond.wait(min(remaining, self.sample_seconds))
+            self.active_pages += 1
+        try:
+            yield
+        finally:
+            with self._cond:
+                self.active_pages -= 1
+                self._cond.notify()
+
+    def launch_args(self, args=()):
+        """Chromium flags that keep a headless browser small."""
+        return list(args) + [
+            '--disable-dev-shm-usage',
+            '--disable-gpu',
+            '--disable-extensions',
+            '--disable-background-networking',
+            '--mute-audio',
+            '--renderer-process-limit=2',
+            f'--js-flags=--max-old-space-size={self.js_heap_mb}',
+        ]
+
+    def watch(self):
+        return _BrowserWatch(self)
+
+    def reap(self, reason):
+        """
+        Kills leftover automation processes: this process's browser children (none should
+        outlive a check) and orphaned Playwright/chromedriver processes of this user whose
+        parent is gone. Returns what was reclaimed.
+        """
+        table = procfs.process_table()
+        uid = os.getuid()
+        pids = set(procfs.find_descendants(patterns=check_watchdog.BROWSER_PROCESS_PATTERNS))
+        for pid, (ppid, cmdline) in table.items():
+            if (ppid == 1 or ppid not in table) and any(p in cmdline for p in ORPHAN_PATTERNS):
+                try:
+                    if os.stat(f'/proc/{pid}').st_uid == uid:
+                        pids.add(pid)
+                except OSError:
+                    continue
+        pids.discard(os.getpid())
+        if not pids:
+            return {'processes': 0, 'rss_mb': 0.0}
+        rss = sum(procfs.process_rss_bytes(pid) for pid in pids)
+        killed = check_watchdog.kill_processes(sorted(pids))
+        report = {'processes': len(killed), 'rss_mb': round(rss / 2 ** 20, 1)}
+        self._record_reap(report, reason, rss)
+        logger.warning(f"Reaped {report['processes']} leftover browser process(es) ({reason}), reclaiming {report['rss_mb']} MB.")
+        return report
+
+    def _record_reap(self, report, reason, rss):
+        self.reclaimed['processes'] += report['processes']
+        self.reclaimed['rss_mb'] = round(self.reclaimed['rss_mb'] + report['rss_mb'], 1)
+        self.last_reap = dict(report, reason=reason, at=time.strftime('%Y-%m-%d %H:%M:%S'))
+        metrics.browser_processes_reaped.inc(reason, amount=report['processes'])
+        metrics.browser_memory_reclaimed.inc(reason, amount=rss)
+
+    def record_limit_kill(self, limit, count=1):
+        self.limit_kills[limit] = self.limit_kills.get(limit, 0) + count
+        metrics.browser_limit_kills.inc(limit, amount=count)
+
+    def merge(self, report):
+        """
+        Folds in a checker worker's report (multi-process mode): its reaps and limit kills
+        count towards this governor and the coordinator's metrics.
+        """
+        for limit, count in report['limit_kills'].items():
+            self.record_limit_kill(limit, count)
+        reaped = report['reaped']
+        if reaped['processes']:
+            self._record_reap(reaped, report['reason'], int(reaped['rss_mb'] * 2 ** 20))
+
+    def snapshot(self):
+        return {
+            'available_mb': procfs.available_memory_bytes() // 2 ** 20,
+            'active_pages': self.active_pages,
+            'allowed_pages': self.allowed_pages(),
+            'reclaimed': dict(self.reclaimed),
+            'limit_kills': dict(self.limit_kills),
+            'last_reap': self.last_reap,
+        }
+
+_governor = ResourceGovernor()
+
+def configure(config):
+    """Applies "browser_limits" from config.json. Called once at startup."""
+    global _governor
+    _governor = ResourceGovernor.from_config(config)
+    return _governor
+
+def get_governor():
+    return _governor
@@ -0,0 +1,61 @@
+import threading
+import time
+from collections import OrderedDict
+
+import metrics
+
+class ResultCache:
+    """
+    Short-lived cache of passing check results keyed by (service, IP), with LRU
+    eviction. Lets the loop skip or downgrade a full browser/Appium check for a pair
+    it validated a few minutes ago.
+    """
+
+    def __init__(self, ttl=900, max_entries=256):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, config):
+        cache_config = config.get('result_cache', {})
+        return cls(cache_config.get('ttl_seconds', 900), cache_config.get('max_entries', 256))
+
+    def get(self, service, ip):
+        key = (service, ip)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and time.monotonic() - entry[0] > self.ttl:
+                del self._entries[key]
+                entry = None
+            if entry is None:
+                self.misses += 1
+                metrics.result_cache_lookups.inc('miss')
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            metrics.result_cache_lookups.inc('hit')
+            return entry[1]
+
+    def put(self, service, ip, result):
+        with self._lock:
+            self._entries[(service, ip)] = (time.monotonic(), result)
+            self._entries.move_to_end((service, ip))
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate_ip(self, ip):
+        with self._lock:
+            for key in [k for k in self._entries if k[1] == ip]:
+                del self._entries[key]
+
+    def invalidate(self, service, ip):
+        with self._lock:
+            self._entries.pop((service, ip), None)
+
+    def stats(self):
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses, 'entries': len(self._entries)}
@@ -0,0 +1,124 @@
+import heapq
+import itertools
+import random
+import time
+
+class ServiceScheduler:
+    """
+    Priority-queue scheduler for OTT checks. Each service has its own interval (with
+    jitter); services that keep failing for reasons unrelated to the IP back off
+    exponentially, and services whose results look suspicious are pulled forward.
+    """
+
+    def __init__(self, ott_services, default_interval=300, jitter=0.1, max_backoff=3600, suspicious_interval=60):
+        self.jitter = jitter
+        self.max_backoff = max_backoff
+        self.suspicious_interval = suspicious_interval
+        self._heap = []
+        self._seq = itertools.count()
+        self._state = {}
+        now = time.monotonic()
+        for service, service_config in ott_services.items():
+            self._state[service] = {
+                'interval': service_config.get('interval_seconds', default_interval),
+                'failures': 0,
+                'last_passed': None,
+                'due': now,
+            }
+            self._push(service, now)
+
+    @classmethod
+    def from_config(cls, config):
+        schedule = config.get('scheduler', {})
+        return cls(
+            config.get('ott_services', {}),
+            default_interval=config.get('loop_interval_seconds', 300),
+            jitter=schedule.get('jitter', 0.1),
+            max_backoff=schedule.get('max_backoff_seconds', 3600),
+            suspicious_interval=schedule.get('suspicious_interval_seconds', 60),
+        )
+
+    def _push(self, service, due):
+        # Entries are never removed from the heap; stale ones are skipped by comparing with state['due']
+        self._state[service]['due'] = due
+        heapq.heappush(self._heap, (due, next(self._seq), service))
+
+    def _jittered(self, seconds):
+        return seconds * (1 + random.uniform(-self.jitter, self.jitter))
+
+    def pop_due(self, now=None):
+        """Returns every service whose check is due, soonest first."""
+        now = now or time.monotonic()
+        due = []
+        while self._heap and self._heap[0][0] <= now:
+            when, _, service = heapq.heappop(self._heap)
+            state = self._state[service]
+            if when == state['due'] and service not in due:
+                due.append(service)
+                # Provisional slot in case the check never reports back (record() replaces it)
+                self._push(service, now + state['interval'])
+        return due
+
+    def seconds_until_next(self, now=None):
+        now = now or time.monotonic()
+        while self._heap and self._heap[0][0] != self._state[self._heap[0][2]]['due']:
+            heapq.heappop(self._heap)
+        if not self._heap:
+            return None
+        return max(0.0, self._heap[0][0] - now)
+
+    def record(self, service, passed, ip_related=True):
+        """Schedules the next check for a service based on the result of the one that just ran."""
+        state = self._state[service]
+        now = time.monotonic()
+        flapped = state['last_passed'] is not None and state['last_passed'] != passed
+        state['last_passed'] = passed
+        if not passed and not ip_related:
+            # Rotating the IP won't help, so don't keep burning browser/device time on it
+            state['failures'] += 1
+            delay = min(state['interval'] * (2 ** state['failures']), self.max_backoff)
+        else:
+            state['failures'] = 0
+            delay = state['interval']
+            if flapped:
+                delay = min(delay, self.suspicious_interval)
+        self._push(service, now + self._jittered(delay))
+
+    def pull_forward(self, service, delay=0):
+        """Moves a service's next check earlier, unless it is backing off."""
+        state = self._state[service]
+        if state['failures']:
+            return
+        due = time.monotonic() + delay
+        if due < state['due']:
+            self._push(service, due)
+
+    def defer(self, service, delay):
+        """Pushes a service's next check out by `delay` seconds regardless of its current slot."""
+        self._push(service, time.monotonic() + delay)
+
+    def reschedule_all(self):
+        """Makes every service not in backoff due now, e.g. after the IP changed."""
+        for service in self._state:
+            self.pull_forward(service)
+
+    def snapshot(self):
+        now = time.monotonic()
+        return {
+            service: {
+                'next_check_in': round(max(0.0, state['due'] - now)),
+                'interval': state['interval'],
+                'failures': state['failures'],
+            }
+            for service, state in self._state.items()
+        }
+
+def is_ip_related_failure(ott_result):
+    """
+    Geo-blocks and navigation failures are blamed on the IP. Configuration errors, crashed
+    checks (e.g. the browser failing to launch), a wrong app in the foreground or an error
+    page that isn't a geo-block are not.
+    """
+    if ott_result.get('error'):
+        return False
+    return ott_result.get('classification') != 'error'
@@ -3,19 +3,53 @@ import json
 import logging
 import time
 import threading
+import multiprocessing
+import queue
+import sys
+import uuid
 from pathlib import Path
 
 # Local Modules
-from ott_checker import check_ott
+_imports_started = time.monotonic()
+from ott_checker import check_ott, load_classification_rules, preload_backends, probe_ott
 import device_manager
 import database
 import telegram_alerter
-from api import create_api
+import metrics
+import profiler
+import resource_governor
+import log_pipeline
+import tracing
+import check_watchdog
+from check_watchdog import CircuitBreaker
+import api_main
+from api import create_api, SocketIOHandler
+from ipc import QueueEmitter, CheckerPool
+from scheduler import ServiceScheduler, is_ip_related_failure
+from tracing import CheckTrace
+from validation import ValidationPolicy
+from result_cache import ResultCache
+from coordination import Coordinator
+IMPORTS_MS = round((time.monotonic() - _imports_started) * 1000, 1)
+
+def _without_countdowns(status):
+    """
+    The status minus the fields that change on every read (time to the next check, free
+    memory), so they alone don't count as a change worth pushing.
+    """
+    stable = dict(status)
+    stable['schedule'] = {
+        service: {key: value for key, value in entry.items() if key != 'next_check_in'}
+        for service, entry in status['schedule'].items()
+    }
+    stable['resources'] = {key: value for key, value in status['resources'].items() if key != 'available_mb'}
+    return stable
 
 class SmartBot:
-    def __init__(self, config):
+    def __init__(self, config, emitter=None):
         self.config = config
         self.logger = logging.getLogger('SmartBot')
+        startup = CheckTrace()
 
         # State
         self.is_paused = False
@@ -29,40 +63,101 @@ class SmartBot:
         self.ip_cache_path = Path(config['paths'].get('ipcache', 'ip_cache.json'))
         self.db_path = Path(config['paths'].get('database', 'smartbot.db'))
         self.session_data_dir = Path(config['paths'].get('browser_sessions', 'browser_sessions'))
+        self.profiles_dir = Path(config['paths'].get('profiles', 'profiles'))
         self.screenshots_dir.mkdir(parents=True, exist_ok=True)
         if not self.ip_cache_path.exists():
             with open(self.ip_cache_path, 'w') as f:
                 json.dump({'good': [], 'bad': []}, f)
 
         # Modules
+        startup.phase('database')
         self.db_conn = database.setup_database(self.db_path)
+        startup.phase('classification_rules')
+        load_classification_rules(config.get('ott_services', {}))
         self.db = database
         self.telegram = telegram_alerter
-        # Get the socket handler from the api module
-        self.api_app, self.api_socketio, socket_io_handler = create_api(self)
+        self.profiler = profiler.SamplingProfiler(self.profiles_dir)
+        self.scheduler = ServiceScheduler.from_config(config)
+        self.validation = ValidationPolicy.from_config(config)
+        self.result_cache = ResultCache.from_config(config)
+        self.validation.stats.load_from_events(database.get_recent_logs(self.db_conn, limit=500))
+        watchdog_config = config.get('watchdog', {})
+        self.breakers = {
+            service: CircuitBreaker(watchdog_config.get('breaker_threshold', 3), watchdog_config.get('breaker_cooldown_seconds', 600))
+            for service in config.get('ott_services', {})
+        }
+        self.checker_pool = None
+        self.coordinator = Coordinator.from_config(config)
+        self.governor = resource_governor.configure(config)
+        # Status fields last pushed to clients; later pushes only carry what changed
+        self._pushed_status = {}
+        self._push_lock = threading.Lock()
+        startup.phase('api')
+        if emitter is None:
+            # Get the socket handler from the api module
+            self.api_app, self.api_socketio, socket_io_handler = create_api(self)
+        else:
+            # Multi-process mode: the API runs elsewhere and events are relayed to it
+            self.api_app, self.api_socketio = None, emitter
+            socket_io_handler = SocketIOHandler(emitter)
         
         # Pass handler to logging setup
+        startup.phase('logging')
         self.setup_logging(socket_io_handler)
+        if emitter is None:
+            # Checks run in this process, so import only the backends the configured modes need.
+            # In multi-process mode the checker workers do this themselves.
+            startup.phase('checker_backends')
+            try:
+                preload_backends(config.get('ott_services', {}))
+            except ImportError as e:
+                self.logger.error(f"Checker backend unavailable: {e}")
+            # Browsers/drivers left behind by a previous run that crashed or was killed
+            startup.phase('reap_orphans')
+            self.governor.reap('startup')
+        startup.end()
+        self.startup_report = {'imports_ms': IMPORTS_MS, 'total_ms': startup.total_ms(), 'phases': startup.spans}
+        if self.coordinator:
+            self.coordinator.start_heartbeat(self.get_status)
+        self.logger.info("Startup took {total_ms} ms after {imports_ms} ms of imports ({phases})".format(
+            total_ms=self.startup_report['total_ms'],
+            imports_ms=IMPORTS_MS,
+            phases=', '.join(f"{s['phase']} {s['duration_ms']} ms" for s in startup.spans),
+        ))
+        if emitter is None and config['api'].get('async_mode', 'threading') != 'threading':
+            # gevent/eventlet patching would break Playwright's sync API in this process
+            self.logger.warning("api.async_mode only applies with process_mode 'multi'; using threading.")
+        # Last, so pushes triggered by device state changes find the bot fully set up. The
+        # first read fills in both ip and healthy before anything is pushed.
+        device_manager.refresh_state()
+        device_manager.subscribe(lambda changes: self.push_status())
+        device_manager.start_refresher()
 
     def setup_logging(self, socket_handler=None):
         # Prevent adding handlers multiple times
         if self.logger.hasHandlers():
             self.logger.handlers.clear()
+        if getattr(self, 'log_listener', None):
+            self.log_listener.stop()
 
+        log_config = self.config.get('logging', {})
         formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
         log_path = self.config['paths'].get('log', 'smartbot.log')
-        
-        # Add file and stream handlers
-        self.logger.addHandler(logging.FileHandler(log_path))
-        self.logger.addHandler(logging.StreamHandler())
-        
+
+        # File/stream/socket output happens on the listener thread, never inline in a check
+        file_handler = log_pipeline.file_handler(log_path, log_config)
+        file_handler.setFormatter(log_pipeline.JsonLinesFormatter() if log_config.get('format') == 'json' else formatter)
+        stream_handler = logging.StreamHandler()
+        stream_handler.setFormatter(formatter)
+        handlers = [file_handler, stream_handler]
+
         # Add the socket handler for live streaming
         if socket_handler:
             socket_handler.setFormatter(formatter)
-            self.logger.addHandler(socket_handler)
-            
-        self.logger.setLevel(logging.INFO)
+            handlers.append(socket_handler)
 
+        self.log_listener = log_pipeline.start(self.logger, handlers, log_config)
+        self.logger.setLevel(logging.INFO)
 
     def load_ip_cache(self):
         with open(self.ip_cache_path) as f:
@@ -81,39 +176,251 @@ class SmartBot:
             cache['bad'].append(ip)
             if ip in cache['good']: cache['good'].remove(ip)
         self.save_ip_cache(cache)
+        if self.coordinator:
+            self.coordinator.flag_ip(ip, status)
 
     def is_ip_flagged(self, ip):
-        return ip in self.load_ip_cache()['bad']
+        if ip in self.load_ip_cache()['bad']:
+            return True
+        return bool(self.coordinator) and self.coordinator.ip_status(ip) == 'bad'
 
     def score_ott_result(self, passed):
         return 50 if passed else 0
     
     def get_status(self):
+        # Cached device state: dashboard polls and pushes never query the modem themselves
+        device = device_manager.get_state()
         return {
             'is_paused': self.is_paused,
             'is_safe_mode': self.is_safe_mode,
-            'current_ip': device_manager.get_current_ip(),
+            'current_ip': device.get('ip'),
+            'device_healthy': device.get('healthy'),
             'last_known_good_ip': self.last_known_good_ip,
             'retries': self.retries,
+            'schedule': self.scheduler.snapshot(),
+            'breakers': {service: breaker.state for service, breaker in self.breakers.items()},
+            'validation': {'policy': self.validation.policy, 'services': self.validation.stats.snapshot()},
+            'result_cache': self.result_cache.stats(),
+            'startup': self.startup_report,
+            'node_id': self.coordinator.node_id if self.coordinator else None,
+            'resources': self.governor.snapshot(),
         }
 
+    def cluster_snapshot(self):
+        if not self.coordinator:
+            return {'enabled': False}
+        return dict(self.coordinator.cluster_snapshot(), enabled=True)
+
+    def push_status(self):
+        """Emits 'status_update' with only the fields that changed since the last push."""
+        status = self.get_status()
+        stable = _without_countdowns(status)
+        with self._push_lock:
+            changes = {key: status[key] for key, value in stable.items() if self._pushed_status.get(key) != value}
+            self._pushed_status = stable
+        if changes:
+            self.api_socketio.emit('status_update', changes)
+
+    def request_rotation(self):
+        self.force_rotate = True
+        # Whatever we validated on this IP is no longer trusted
+        self.result_cache.invalidate_ip(device_manager.get_state().get('ip'))
+
     def pause(self):
         self.is_paused = True
         self.logger.info("Bot has been paused via API.")
         self.db.log_event(self.db_conn, "control", "Bot paused")
+        self.push_status()
 
     def resume(self):
         self.is_paused = False
         self.is_safe_mode = False # Resume also exits safe mode
+        self.scheduler.reschedule_all()
         self.logger.info("Bot has been resumed via API.")
         self.db.log_event(self.db_conn, "control", "Bot resumed")
+        self.push_status()
+
+    def check_service(self, service, service_config, current_ip):
+        """Runs one OTT check, records/broadcasts the result and schedules the next one."""
+        check_id = uuid.uuid4().hex[:12]
+        context_token = log_pipeline.set_check_context(service=service, ip=current_ip, check_id=check_id)
+        try:
+            return self._check_service(service, service_config, current_ip, check_id)
+        finally:
+            log_pipeline.reset_check_context(context_token)
+
+    def _check_service(self, service, service_config, current_ip, check_id):
+        self.logger.info(f"Checking OTT for {service}...")
+        deadline = service_config.get('deadline_seconds', self.config.get('watchdog', {}).get('check_deadline_seconds', 240))
+        trace = CheckTrace()
+        check_started = time.monotonic()
+        ott_result = self.check_cached(service, service_config, current_ip, trace)
+        if ott_result is not None:
+            finished = True
+        else:
+            finished, ott_result = self.run_check(service, service_config, deadline, trace)
+            if not self.checker_pool:
+                # Checker workers reap their own; here any browser still alive after a check is a leak
+                self.governor.reap('post_check')
+        if not finished:
+            trace.end()
+            ott_result = {
+                'success': False,
+                'timed_out': True,
+                'error': f'Check exceeded its {deadline}s deadline',
+                'drm_handshake_detected': False,
+                'final_screenshot_path': None,
+                'drm_screenshot_path': None,
+                'spans': trace.spans,
+            }
+        timed_out = not finished
+        duration_ms = round((time.monotonic() - check_started) * 1000, 1)
+        spans = ott_result.get('spans', [])
+        tracing.histograms.record(service, spans, duration_ms)
+        metrics.checks_total.inc(service, 'timeout' if timed_out else ('pass' if ott_result['success'] else 'fail'))
+        metrics.check_duration.observe(duration_ms / 1000, service)
+        if not ott_result.get('cached') and not timed_out:
+            self.validation.stats.record(service, duration_ms, ott_result['success'])
+
+        # Cached results say nothing about whether the service is timing out
+        if not ott_result.get('cached') and self.breakers[service].record(timed_out):
+            self.logger.error(f"Circuit breaker opened for {service} after repeated timeouts.")
+            self.db.log_event(self.db_conn, "circuit_open", json.dumps({'service': service, 'timeouts': self.breakers[service].timeouts}))
+            self.telegram.send_message(self.config['telegram']['bot_token'], self.config['telegram']['chat_id'], f"⏸️ {service} keeps timing out. Pausing its checks for {self.breakers[service].cooldown}s.")
+        
+        passed = ott_result['success']
+        final_screenshot = ott_result['final_screenshot_path']
+        drm_detected = ott_result['drm_handshake_detected']
+        drm_screenshot = ott_result['drm_screenshot_path']
+
+        score = self.score_ott_result(passed)
+        log_data = {'check_id': check_id, 'service': service, 'ip': current_ip, 'passed': passed, 'score': score, 'drm_detected': drm_detected, 'screenshot': final_screenshot, 'duration_ms': duration_ms, 'spans': spans}
+        if timed_out:
+            log_data['timed_out'] = True
+        cached = ott_result.get('cached', False)
+        if cached:
+            log_data['cached'] = True
+        self.db.log_event(self.db_conn, "ott_check", json.dumps(log_data))
+        
+        # Emit events for real-time frontend updates
+        event_timestamp = time.strftime('%Y-%m-%d %H:%M:%S')
+        self.api_socketio.emit('new_db_log', {'timestamp': event_timestamp, 'event_type': 'ott_check', 'details': json.dumps(log_data)})
+        self.api_socketio.emit('ott_check', {'timestamp': event_timestamp, 'details': log_data})
+        if final_screenshot and not cached:
+            self.api_socketio.emit('new_screenshot', {'filename': Path(final_screenshot).name})
+
+        # Handle DRM handshake event specifically
+        if drm_detected:
+            self.logger.info(f"DRM handshake detected for {service}. Logging and sending alert.")
+            drm_log_data = {'service': service, 'ip': current_ip, 'screenshot': drm_screenshot, 'license': ott_result.get('drm_event')}
+            self.db.log_event(self.db_conn, "drm_handshake", json.dumps(drm_log_data))
+            
+            # Emit events for real-time frontend updates
+            drm_event_timestamp = time.strftime('%Y-%m-%d %H:%M:%S')
+            self.api_socketio.emit('new_db_log', {'timestamp': drm_event_timestamp, 'event_type': 'drm_handshake', 'details': json.dumps(drm_log_data)})
+            self.api_socketio.emit('drm_handshake', {'timestamp': drm_event_timestamp, 'details': drm_log_data})
+            if drm_screenshot:
+                self.api_socketio.emit('new_screenshot', {'filename': Path(drm_screenshot).name})
+                self.telegram.send_photo(self.config['telegram']['bot_token'], self.config['telegram']['chat_id'], drm_screenshot, caption=f"✅ DRM Handshake SUCCESS for {service} on IP {current_ip}")
+            else:
+                self.telegram.send_message(self.config['telegram']['bot_token'], self.config['telegram']['chat_id'], f"✅ DRM Handshake SUCCESS for {service} on IP {current_ip}")
+        
+        if timed_out:
+            # A hung browser/driver says nothing about the IP, so don't flag it
+            self.logger.error(f"OTT check for {service} timed out after {deadline}s; browser/driver torn down.")
+            self.telegram.send_message(self.config['telegram']['bot_token'], self.config['telegram']['chat_id'], f"⏱️ OTT Check TIMED OUT for {service} on IP {current_ip}")
+        elif not passed:
+            self.result_cache.invalidate_ip(current_ip)
+            self.telegram.send_message(self.config['telegram']['bot_token'], self.config['telegram']['chat_id'], f"❌ OTT Check FAILED for {service} on IP {current_ip}")
+        else:
+            if not cached:
+                self.result_cache.put(service, current_ip, ott_result)
+            # Only send generic success if no specific DRM event was fired (or nothing new was checked)
+            if not drm_detected and not cached:
+                self.telegram.send_photo(self.config['telegram']['bot_token'], self.config['telegram']['chat_id'], final_screenshot, caption=f"✅ OTT Check PASSED for {service} on IP {current_ip}")
+
+        if self.coordinator and not cached and not timed_out:
+            self.coordinator.publish_result(service, current_ip, passed)
+
+        self.scheduler.record(service, passed, ip_related=passed or is_ip_related_failure(ott_result))
+        return ott_result
+
+    def check_cached(self, service, service_config, current_ip, trace):
+        """
+        Returns a result built from a recent pass of this (service, IP) if there is one and it
+        still holds, else None. Depending on result_cache.mode the cached pass is trusted as is
+        ('skip') or confirmed with a cheap HTTP probe first ('probe').
+        """
+        cached = self.result_cache.get(service, current_ip)
+        if cached is None and self.coordinator:
+            # Another node may have validated this (service, IP) pair recently
+            shared = self.coordinator.shared_pass(service, current_ip, self.result_cache.ttl)
+            if shared:
+                cached = {'success': True, 'classification': 'pass', 'final_screenshot_path': None, 'validated_by': shared['node']}
+        if cached is None:
+            return None
+        if self.config.get('result_cache', {}).get('mode', 'probe') == 'probe':
+            trace.phase('cache_probe')
+            confirmed = probe_ott(service, service_config)
+            trace.end()
+            if not confirmed:
+                self.logger.info(f"Cached pass for {service} on {current_ip} not confirmed by probe, running full check.")
+                self.result_cache.invalidate(service, current_ip)
+                return None
+        self.logger.info(f"Reusing recent pass for {service} on {current_ip}.")
+        # DRM evidence belongs to the original check, don't re-announce it
+        return dict(cached, cached=True, drm_handshake_detected=False, drm_event=None, drm_screenshot_path=None, spans=trace.spans)
+
+    def run_check(self, service, service_config, deadline, trace):
+        """Runs check_ott under its deadline, in-process or on a checker worker process."""
+        if self.checker_pool:
+            return self.checker_pool.run(service, service_config, deadline)
+        return check_watchdog.run_with_deadline(
+            check_ott, deadline, service, service_config, self.screenshots_dir, self.logger, trace=trace
+        )
+
+    def render_metrics(self):
+        return metrics.render()
+
+    def latency_snapshot(self):
+        return tracing.histograms.snapshot()
+
+    def serve_controls(self, control_queue, snapshot_interval=5):
+        """
+        Multi-process mode: applies controls forwarded by the API process and keeps its
+        status/metrics/latency snapshots fresh.
+        """
+        while True:
+            try:
+                command = control_queue.get(timeout=snapshot_interval)
+            except queue.Empty:
+                command = None
+            try:
+                if command == 'pause':
+                    self.pause()
+                elif command == 'resume':
+                    self.resume()
+                elif command == 'rotate':
+                    self.request_rotation()
+                self.api_socketio.push('__status__', self.get_status())
+                self.api_socketio.push('__metrics__', self.render_metrics())
+                self.api_socketio.push('__latency__', self.latency_snapshot())
+                self.api_socketio.push('__cluster__', self.cluster_snapshot())
+            except Exception as e:
+                self.logger.error(f"Control handling failed: {e}", exc_info=True)
+
+    def idle(self, seconds):
+        """Sleeps until the next check is due, waking early for pause or a forced rotation."""
+        deadline = time.monotonic() + seconds
+        while time.monotonic() < deadline and not (self.force_rotate or self.is_paused or self.is_safe_mode):
+            time.sleep(min(1, deadline - time.monotonic()))
 
     def run_api(self):
         host = self.config['api'].get('host', '0.0.0.0')
         port = self.config['api'].get('port', 5000)
         self.api_socketio.run(self.api_app, host=host, port=port)
 
-    def run(self):
+    def run(self, start_api=True):
         self.db.log_event(self.db_conn, "lifecycle", "SmartBot started")
         self.logger.info("SmartBot Started")
         self.telegram.send_message(
@@ -121,9 +428,10 @@ class SmartBot:
             self.config['telegram']['chat_id'],
             "✅ SmartBot Started"
         )
-        # Run Flask API in a separate thread
-        api_thread = threading.Thread(target=self.run_api, daemon=True)
-        api_thread.start()
+        if start_api:
+            # Run Flask API in a separate thread
+            api_thread = threading.Thread(target=self.run_api, name='api', daemon=True)
+            api_thread.start()
         
         while True:
             if self.is_paused or self.is_safe_mode:
@@ -135,6 +443,7 @@ class SmartBot:
                 # 1. Device health check
                 if not device_manager.device_health():
                     self.is_safe_mode = True
+                    metrics.safe_mode_entries.inc('device_health')
                     self.logger.error("Device health check failed. Entering SAFE MODE.")
                     self.db.log_event(self.db_conn, "error", "Device health failed")
                     self.telegram.send_message(self.config['telegram']['bot_token'], self.config['telegram']['chat_id'], "🚨 Device health failed! Entering SAFE MODE.")
@@ -145,89 +454,171 @@ class SmartBot:
                 if self.is_ip_flagged(current_ip) or self.force_rotate:
                     self.logger.warning(f"IP {current_ip} is flagged or rotation forced. Rotating...")
                     self.db.log_event(self.db_conn, "rotation", f"IP {current_ip} flagged or rotation forced")
-                    current_ip = device_manager.rotate_ip()
+                    self.result_cache.invalidate_ip(current_ip)
+                    metrics.rotations_total.inc('forced' if self.force_rotate else 'flagged')
+                    with metrics.rotation_duration.time():
+                        current_ip = device_manager.rotate_ip()
+                    self.scheduler.reschedule_all()
                     self.force_rotate = False
                     continue
 
-                # 3. OTT checks
-                all_passed = True
-                for service, service_config in self.config.get('ott_services', {}).items():
-                    self.logger.info(f"Checking OTT for {service}...")
-                    ott_result = check_ott(service, service_config, self.screenshots_dir, self.logger)
-                    
-                    passed = ott_result['success']
-                    final_screenshot = ott_result['final_screenshot_path']
-                    drm_detected = ott_result['drm_handshake_detected']
-                    drm_screenshot = ott_result['drm_screenshot_path']
-
-                    score = self.score_ott_result(passed)
-                    log_data = {'service': service, 'ip': current_ip, 'passed': passed, 'score': score, 'drm_detected': drm_detected, 'screenshot': final_screenshot}
-                    self.db.log_event(self.db_conn, "ott_check", json.dumps(log_data))
-                    
-                    # Emit events for real-time frontend updates
-                    event_timestamp = time.strftime('%Y-%m-%d %H:%M:%S')
-                    self.api_socketio.emit('new_db_log', {'timestamp': event_timestamp, 'event_type': 'ott_check', 'details': json.dumps(log_data)})
-                    self.api_socketio.emit('ott_check', {'timestamp': event_timestamp, 'details': log_data})
-                    self.api_socketio.emit('new_screenshot', {'filename': Path(final_screenshot).name})
-
-                    # Handle DRM handshake event specifically
-                    if drm_detected and drm_screenshot:
-                        self.logger.info(f"DRM handshake detected for {service}. Logging and sending alert.")
-                        drm_log_data = {'service': service, 'ip': current_ip, 'screenshot': drm_screenshot}
-                        self.db.log_event(self.db_conn, "drm_handshake", json.dumps(drm_log_data))
-                        
-                        # Emit events for real-time frontend updates
-                        drm_event_timestamp = time.strftime('%Y-%m-%d %H:%M:%S')
-                        self.api_socketio.emit('new_db_log', {'timestamp': drm_event_timestamp, 'event_type': 'drm_handshake', 'details': json.dumps(drm_log_data)})
-                        self.api_socketio.emit('drm_handshake', {'timestamp': drm_event_timestamp, 'details': drm_log_data})
-                        self.api_socketio.emit('new_screenshot', {'filename': Path(drm_screenshot).name})
-                        self.telegram.send_photo(self.config['telegram']['bot_token'], self.config['telegram']['chat_id'], drm_screenshot, caption=f"✅ DRM Handshake SUCCESS for {service} on IP {current_ip}")
-                    
-                    if not passed:
-                        all_passed = False
-                        self.add_ip_to_cache(current_ip, 'bad')
-                        self.telegram.send_message(self.config['telegram']['bot_token'], self.config['telegram']['chat_id'], f"❌ OTT Check FAILED for {service} on IP {current_ip}")
-                    else:
-                        self.add_ip_to_cache(current_ip, 'good')
-                        self.last_known_good_ip = current_ip
-                        device_manager.set_last_known_good_ip(current_ip)
-                        # Only send generic success if no specific DRM event was fired
-                        if not drm_detected:
-                            self.telegram.send_photo(self.config['telegram']['bot_token'], self.config['telegram']['chat_id'], final_screenshot, caption=f"✅ OTT Check PASSED for {service} on IP {current_ip}")
+                # 3. OTT checks for the services that are due
+                due_services = self.scheduler.pop_due()
+                if not due_services:
+                    wait = self.scheduler.seconds_until_next()
+                    if wait is None:
+                        wait = self.config.get('loop_interval_seconds', 300)
+                    self.logger.info(f"No checks due. Next check in {wait:.0f} seconds.")
+                    self.idle(wait)
+                    continue
+
+                ott_services = self.config.get('ott_services', {})
+                runnable = []
+                deferred = set()
+                for service in due_services:
+                    breaker = self.breakers[service]
+                    if not breaker.allow():
+                        self.logger.info(f"Skipping {service}: circuit open for another {breaker.remaining():.0f}s.")
+                        self.scheduler.defer(service, breaker.remaining())
+                        deferred.add(service)
+                        continue
+                    if self.coordinator:
+                        # Another node may be checking this (service, device) pair right now
+                        claimed, remaining = self.coordinator.claim(service)
+                        if not claimed:
+                            self.logger.info(f"Skipping {service}: leased by another node for {remaining:.0f}s.")
+                            self.scheduler.defer(service, remaining)
+                            deferred.add(service)
+                            continue
+                    runnable.append(service)
+
+                # Timeouts and resource limits say nothing about the IP, so they drop out of the total instead of counting as failures
+                ordered = self.validation.order(runnable)
+                passed_count = failed_count = 0
+                total = len(ordered)
+                decision = None
+                try:
+                    for i, service in enumerate(ordered):
+                        if self.coordinator and not self.coordinator.claim(service)[0]:
+                            # Our lease ran out during earlier checks and another node took the pair over
+                            total -= 1
+                            continue
+                        ott_result = self.check_service(service, ott_services[service], current_ip)
+                        if ott_result.get('timed_out') or ott_result.get('resource_limit'):
+                            total -= 1
+                        elif ott_result['success']:
+                            passed_count += 1
+                        else:
+                            failed_count += 1
+                        if self.validation.policy == 'quorum':
+                            # Decided over every service that can still be checked on this IP, not just this round's
+                            if not (ott_result.get('timed_out') or ott_result.get('resource_limit')):
+                                self.validation.vote(current_ip, service, ott_result['success'])
+                            checkable = [s for s in ott_services if self.breakers[s].allow()]
+                            decision = self.validation.decide_ip(current_ip, checkable)
+                        else:
+                            decision = self.validation.decide(passed_count, failed_count, total)
+                        if decision:
+                            if i + 1 < len(ordered):
+                                self.logger.info(f"IP {current_ip} {decision}ed by '{self.validation.policy}' policy after {i + 1}/{len(ordered)} checks.")
+                            break
+                finally:
+                    if self.coordinator:
+                        for service in runnable:
+                            self.coordinator.release(service)
+
+                if decision is None and self.validation.policy == 'quorum':
+                    # The IP is undecided until more services vote on it; check those sooner,
+                    # except the ones just deferred (leased elsewhere, circuit open)
+                    voted = self.validation.votes(current_ip)
+                    for service in ott_services:
+                        if service not in voted and service not in ordered and service not in deferred and self.breakers[service].allow():
+                            self.scheduler.pull_forward(service)
+
+                if decision == 'accept':
+                    self.add_ip_to_cache(current_ip, 'good')
+                    self.last_known_good_ip = current_ip
+                    device_manager.set_last_known_good_ip(current_ip)
+                elif decision == 'reject':
+                    self.add_ip_to_cache(current_ip, 'bad')
+                    self.result_cache.invalidate_ip(current_ip)
 
                 # 4. Rotation logic
-                if not all_passed:
+                if decision == 'reject':
                     self.logger.warning(f"IP {current_ip} failed OTT check. Rotating IP.")
-                    device_manager.rotate_ip()
+                    metrics.rotations_total.inc('check_failed')
+                    with metrics.rotation_duration.time():
+                        device_manager.rotate_ip()
+                    self.scheduler.reschedule_all()
                     self.retries += 1
                     if self.retries >= self.config.get('max_retries', 3):
                         self.is_safe_mode = True
+                        metrics.safe_mode_entries.inc('max_retries')
                         self.logger.error("Max retries reached. Entering SAFE MODE.")
                         self.db.log_event(self.db_conn, "error", "Max retries reached")
-                        self.api_socketio.emit('status_update', self.get_status())
+                        self.push_status()
                         self.telegram.send_message(self.config['telegram']['bot_token'], self.config['telegram']['chat_id'], "🚨 Max retries reached! Entering SAFE MODE.")
                     else:
-                        self.api_socketio.emit('status_update', self.get_status())
+                        self.push_status()
                         self.logger.info("Sleeping for 5 seconds after IP rotation.")
                         time.sleep(5)
-                    continue  # Skip the long sleep at the end of the loop
-                else:
+                    continue
+                elif decision == 'accept':
                     self.retries = 0
                 
-                self.api_socketio.emit('status_update', self.get_status())
-                
-                interval = self.config.get('loop_interval_seconds', 300)
-                self.logger.info(f"Loop finished. Sleeping for {interval} seconds.")
-                time.sleep(interval)
+                self.push_status()
 
             except Exception as e:
                 self.is_safe_mode = True
+                metrics.safe_mode_entries.inc('unexpected_error')
                 self.logger.error(f"Unexpected error: {e}. Entering SAFE MODE.", exc_info=True)
                 self.db.log_event(self.db_conn, "error", f"Unexpected error: {e}")
                 self.telegram.send_message(self.config['telegram']['bot_token'], self.config['telegram']['chat_id'], f"🔥 UNEXPECTED ERROR: {e}. Entering SAFE MODE.")
         
                 self.db.log_event(self.db_conn, "lifecycle", "SmartBot stopped")
 
+def run_multiprocess(config):
+    """
+    Runs the API, the checker workers and the coordinating bot loop as separate processes
+    (see ipc.py). Enabled with "process_mode": "multi".
+    """
+    ctx = multiprocessing.get_context('spawn')
+    events_queue = ctx.Queue(maxsize=10000)
+    control_queue = ctx.Queue()
+
+    def start_api_process():
+        process = ctx.Process(target=api_main.main, args=(config, events_queue, control_queue), name='smartbot-api', daemon=True)
+        # A spawned child re-imports the parent's main module before running its target. Make
+        # that api_main rather than smartbot.py, so nothing is imported ahead of the patching.
+        main_module = sys.modules['__main__']
+        sys.modules['__main__'] = api_main
+        try:
+            process.start()
+        finally:
+            sys.modules['__main__'] = main_module
+        return process
+
+    api = {'process': start_api_process()}
+
+    def supervise_api(restart_delay=10):
+        # Nothing else would notice the dashboard/API going down while checks carry on
+        while True:
+            api['process'].join()
+            logger = logging.getLogger('SmartBot')
+            logger.error(f"API process exited with code {api['process'].exitcode}; restarting it in {restart_delay}s.")
+            time.sleep(restart_delay)
+            api['process'] = start_api_process()
+
+    bot = SmartBot(config, emitter=QueueEmitter(events_queue))
+    bot.checker_pool = CheckerPool(ctx, config, size=config.get('checker_workers', 1))
+    threading.Thread(target=bot.serve_controls, args=(control_queue,), name='control', daemon=True).start()
+    threading.Thread(target=supervise_api, name='api-supervisor', daemon=True).start()
+    try:
+        bot.run(start_api=False)
+    finally:
+        bot.checker_pool.shutdown()
+        api['process'].terminate()
+
 def main():
     CONFIG_PATH = Path(__file__).parent / 'config.json'
     if not CONFIG_PATH.exists():
@@ -236,6 +627,9 @@ def main():
     with open(CONFIG_PATH) as f:
         config = json.load(f)
     
+    if config.get('process_mode', 'single') == 'multi':
+        run_multiprocess(config)
+        return
     bot = SmartBot(config)
     bot.run()
 
@@ -1,6 +1,8 @@
 import requests
 import logging
 
+import metrics
+
 logger = logging.getLogger('SmartBot')
 
 def send_message(token, chat_id, message):
@@ -9,10 +11,13 @@ def send_message(token, chat_id, message):
     url = f"https://api.telegram.org/bot{token}/sendMessage"
     data = {"chat_id": chat_id, "text": message}
     try:
-        response = requests.post(url, data=data, timeout=10)
+        with metrics.telegram_send_duration.time('message'):
+            response = requests.post(url, data=data, timeout=10)
         if response.status_code != 200:
+            metrics.telegram_failures.inc('message')
             logger.warning(f"Telegram message failed: {response.text}")
     except Exception as e:
+        metrics.telegram_failures.inc('message')
         logger.error(f"Telegram send failed: {e}")
 
 def send_photo(token, chat_id, photo_path, caption=""):
@@ -23,8 +28,11 @@ def send_photo(token, chat_id, photo_path, caption=""):
         with open(photo_path, "rb") as f:
             files = {"photo": f}
             data = {"chat_id": chat_id, "caption": caption}
-            response = requests.post(url, data=data, files=files, timeout=20)
+            with metrics.telegram_send_duration.time('photo'):
+                response = requests.post(url, data=data, files=files, timeout=20)
             if response.status_code != 200:
+                metrics.telegram_failures.inc('photo')
                 logger.warning(f"Telegram photo failed: {response.text}")
     except Exception as e:
+        metrics.telegram_failures.inc('photo')
         logger.error(f"Telegram send photo failed: {e}") 
\ No newline at end of file
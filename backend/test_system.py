@@ -8,6 +8,7 @@ import requests
 import json
 import time
 import os
+import importlib.util
 
 def run_command(command):
     """Run command and return result"""
@@ -123,15 +124,13 @@ def test_file_permissions():
 def test_dependencies():
     """Test Python dependencies"""
     print("🔍 Testing Python dependencies...")
-    try:
-        import flask
-        import playwright
-        import appium
+    # find_spec only locates the packages, it doesn't pay for importing Playwright/Appium
+    missing = [name for name in ('flask', 'playwright', 'appium') if importlib.util.find_spec(name) is None]
+    if not missing:
         print("   ✅ All dependencies available")
         return True
-    except ImportError as e:
-        print(f"   ❌ Missing dependency: {e}")
-        return False
+    print(f"   ❌ Missing dependency: {', '.join(missing)}")
+    return False
 
 def main():
     print("🧪 SmartBot System Test")
@@ -0,0 +1,74 @@
+import threading
+import time
+
+# Histogram bucket upper bounds in milliseconds
+LATENCY_BUCKETS_MS = (100, 250, 500, 1000, 2500, 5000, 10000, 20000, 30000, 60000, 120000)
+
+class CheckTrace:
+    """
+    Records the phases of a single OTT check. Phases are sequential: starting a new
+    phase closes the previous one, and `end()` closes whatever is still open.
+    """
+
+    def __init__(self):
+        self.started = time.monotonic()
+        self.spans = []
+        self._current = None
+
+    def phase(self, name):
+        self.end()
+        self._current = (name, time.monotonic())
+
+    def end(self):
+        if self._current is None:
+            return
+        name, start = self._current
+        now = time.monotonic()
+        self.spans.append({
+            'phase': name,
+            'start_ms': round((start - self.started) * 1000, 1),
+            'duration_ms': round((now - start) * 1000, 1),
+        })
+        self._current = None
+
+    def total_ms(self):
+        return round((time.monotonic() - self.started) * 1000, 1)
+
+class LatencyHistograms:
+    """Per-service, per-phase latency histograms with fixed buckets."""
+
+    def __init__(self, buckets=LATENCY_BUCKETS_MS):
+        self.buckets = buckets
+        self._data = {}
+        self._lock = threading.Lock()
+
+    def observe(self, service, phase, duration_ms):
+        with self._lock:
+            entry = self._data.setdefault((service, phase), {'counts': [0] * (len(self.buckets) + 1), 'sum_ms': 0.0, 'count': 0})
+            for i, bound in enumerate(self.buckets):
+                if duration_ms <= bound:
+                    break
+            else:
+                i = len(self.buckets)
+            entry['counts'][i] += 1
+            entry['sum_ms'] += duration_ms
+            entry['count'] += 1
+
+    def record(self, service, spans, total_ms=None):
+        for span in spans:
+            self.observe(service, span['phase'], span['duration_ms'])
+        if total_ms is not None:
+            self.observe(service, 'total', total_ms)
+
+    def snapshot(self):
+        with self._lock:
+            result = {}
+            for (service, phase), entry in self._data.items():
+                result.setdefault(service, {})[phase] = {
+                    'buckets': dict(zip([str(b) for b in self.buckets] + ['+Inf'], entry['counts'])),
+                    'count': entry['count'],
+                    'avg_ms': round(entry['sum_ms'] / entry['count'], 1),
+                }
+            return result
+
+histograms = LatencyHistograms()
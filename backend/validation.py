@@ -0,0 +1,119 @@
+import json
+
+POLICIES = ('all', 'fail_fast', 'quorum')
+
+class ServiceStats:
+    """Exponentially weighted check duration and failure rate per service."""
+
+    def __init__(self, alpha=0.3):
+        self.alpha = alpha
+        self._stats = {}
+
+    def record(self, service, duration_ms, passed):
+        stats = self._stats.get(service)
+        failed = 0.0 if passed else 1.0
+        if stats is None:
+            self._stats[service] = {'duration_ms': duration_ms, 'failure_rate': failed}
+            return
+        stats['duration_ms'] += self.alpha * (duration_ms - stats['duration_ms'])
+        stats['failure_rate'] += self.alpha * (failed - stats['failure_rate'])
+
+    def load_from_events(self, rows):
+        """Seeds the stats from (timestamp, event_type, details) rows, newest first."""
+        for _, event_type, details in reversed(rows):
+            if event_type != 'ott_check':
+                continue
+            try:
+                data = json.loads(details)
+            except (TypeError, ValueError):
+                continue
+            # Same rows as the live path records: no cached results, no deadline-capped timeouts
+            if 'duration_ms' in data and not data.get('cached') and not data.get('timed_out'):
+                self.record(data['service'], data['duration_ms'], data['passed'])
+
+    def get(self, service):
+        return self._stats.get(service)
+
+    def snapshot(self):
+        return {
+            service: {'duration_ms': round(s['duration_ms']), 'failure_rate': round(s['failure_rate'], 2)}
+            for service, s in self._stats.items()
+        }
+
+class ValidationPolicy:
+    """
+    Decides when an IP has been validated or rejected while its due services are checked.
+
+    - all: check every service; any failure rejects the IP (original behaviour)
+    - fail_fast: stop at the first failure and reject
+    - quorum: accept once `quorum` services pass on the IP, reject once that can no longer
+      happen. Votes are kept per IP across scheduler rounds (see vote/decide_ip), so the
+      outcome doesn't depend on which services happened to be due together.
+
+    With order 'cheapest_first' services are sorted by expected time to reach a decision:
+    history-less services first, then by duration divided by the probability that the
+    check settles the outcome (failure rate, or pass rate for quorum).
+    """
+
+    def __init__(self, policy='all', order='config', quorum=None, stats=None):
+        if policy not in POLICIES:
+            raise ValueError(f"Unknown validation policy '{policy}', expected one of {POLICIES}")
+        self.policy = policy
+        self.order_mode = order
+        self.quorum = quorum
+        self.stats = stats or ServiceStats()
+        self._votes_ip = None
+        self._votes = {}
+
+    @classmethod
+    def from_config(cls, config):
+        validation = config.get('validation', {})
+        return cls(validation.get('policy', 'all'), validation.get('order', 'config'), validation.get('quorum'))
+
+    def order(self, services):
+        if self.order_mode != 'cheapest_first':
+            return list(services)
+
+        def cost(service):
+            stats = self.stats.get(service)
+            if stats is None:
+                return (0, 0.0)
+            decisive = 1 - stats['failure_rate'] if self.policy == 'quorum' else stats['failure_rate']
+            return (1, stats['duration_ms'] / max(decisive, 0.05))
+
+        return sorted(services, key=cost)
+
+    def vote(self, ip, service, passed):
+        """Records a service's result on `ip`. Votes from a previous IP are dropped."""
+        if ip != self._votes_ip:
+            self._votes_ip, self._votes = ip, {}
+        self._votes[service] = passed
+
+    def votes(self, ip):
+        return dict(self._votes) if ip == self._votes_ip else {}
+
+    def decide_ip(self, ip, checkable):
+        """Quorum decision from every vote on `ip` so far, out of the `checkable` services."""
+        votes = self.votes(ip)
+        passed = sum(1 for p in votes.values() if p)
+        return self.decide(passed, len(votes) - passed, len(set(checkable) | set(votes)))
+
+    def decide(self, passed, failed, total):
+        """Returns 'accept', 'reject' or None (keep checking) after each result."""
+        if passed + failed == 0:
+            return None
+        if self.policy == 'quorum':
+            needed = self.quorum or total
+            if passed >= needed:
+                return 'accept'
+            if total < needed:
+                # Too few checkable services to ever reach the quorum; stay undecided
+                return None
+            if total - failed < needed:
+                return 'reject'
+            return None
+        if failed and self.policy == 'fail_fast':
+            return 'reject'
+        if passed + failed < total:
+            return None
+        return 'reject' if failed else 'accept'
@@ -98,6 +98,24 @@ def api_drm_handshakes():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
         
+@app.route('/api/cluster')
+@login_required
+def api_cluster():
+    try:
+        r = requests.get(f'{BACKEND_API}/api/cluster', timeout=5)
+        return jsonify(r.json())
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/latency')
+@login_required
+def api_latency():
+    try:
+        r = requests.get(f'{BACKEND_API}/api/latency', timeout=5)
+        return jsonify(r.json())
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
 @app.route('/api/screenshots')
 @login_required
 def api_screenshots():
@@ -117,12 +135,31 @@ def serve_screenshot_from_backend(filename):
     except requests.exceptions.RequestException as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/profiles')
+@login_required
+def api_profiles():
+    try:
+        r = requests.get(f'{BACKEND_API}/api/profiles', timeout=5)
+        return jsonify(r.json())
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/profiles/<path:filename>')
+@login_required
+def serve_profile_from_backend(filename):
+    try:
+        resp = requests.get(f'{BACKEND_API}/profiles/{filename}', stream=True, timeout=10)
+        resp.raise_for_status()
+        return resp.raw.read(), resp.status_code, resp.headers.items()
+    except requests.exceptions.RequestException as e:
+        return jsonify({'error': str(e)}), 500
+
 @app.route('/api/control/<action>', methods=['POST'])
 @login_required
 def api_control(action):
     try:
-        r = requests.post(f'{BACKEND_API}/api/control/{action}', timeout=10)
-        return jsonify(r.json())
+        r = requests.post(f'{BACKEND_API}/api/control/{action}', params=request.args, timeout=10)
+        return jsonify(r.json()), r.status_code
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 